@@ -1,11 +1,13 @@
-from typing import List, Optional
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 import shutil
 import uuid
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Form
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Form, Response
+from fastapi.responses import FileResponse as StarletteFileResponse
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -13,16 +15,20 @@ from app.core.logging import app_logger
 from app.core.database import get_db
 from app.models.file import FileRecord
 from app.schemas.file import FileCreate, FileResponse, FileUpdate
-from app.services.file_service import FileService
+from app.services.file_service import FileService, encode_cursor
 from app.services.file_storage import LocalFileService
 from app.utils.file_utils import get_file_type, validate_file_size, validate_file_type
 
 router = APIRouter()
 
+# 批量索引每批处理的文件数，与批量写入内容的提交批次一致
+INDEX_BATCH_SIZE = 50
+
 # 依赖注入
 def get_file_service(db: Session = Depends(get_db)):
     return FileService(db)
 
+@lru_cache(maxsize=1)
 def get_storage_service():
     return LocalFileService()
 
@@ -104,7 +110,7 @@ async def upload_files(
                 
                 # 保存到数据库
                 app_logger.info(f"🔥 开始保存到数据库")
-                file_record = file_service.create_file(file_create)
+                file_record = await asyncio.to_thread(file_service.create_file, file_create)
                 app_logger.info(f"🔥 数据库记录创建成功: {file_record.id}")
                 
                 uploaded_files.append(file_record)
@@ -115,18 +121,17 @@ async def upload_files(
                 try:
                     app_logger.info(f"🤖 开始自动提取文件内容: {file.filename}")
                     
-                    # 重新读取文件数据用于内容提取
-                    await file.seek(0)  # 重置文件指针
-                    file_data = await file.read()
-                    
-                    # 提取文件内容
-                    content = await file_service.extract_content(file_data, file.content_type or "")
+                    # 直接从已保存的文件提取内容，避免再次读入内存
+                    content = await file_service.extract_content(
+                        storage_service.get_file_path(stored_filename),
+                        file.content_type or ""
+                    )
                     
                     if content and content.strip():
                         app_logger.info(f"🤖 内容提取成功，长度: {len(content)} 字符")
                         
                         # 更新文件内容到数据库
-                        await file_service.update_file_content(file_record.id, content)
+                        await asyncio.to_thread(file_service.update_file_content, file_record.id, content)
                         
                         # 索引到向量数据库
                         if project_id:
@@ -154,7 +159,7 @@ async def upload_files(
                             if success:
                                 app_logger.info(f"🤖 文件已成功索引到向量数据库: {file.filename}")
                                 # 标记文件已处理
-                                file_service.mark_file_processed(file_record.id)
+                                await asyncio.to_thread(file_service.mark_file_processed, file_record.id)
                             else:
                                 app_logger.warning(f"🤖 文件索引到向量数据库失败: {file.filename}")
                         else:
@@ -183,17 +188,21 @@ async def upload_files(
         raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
 
 @router.get("/", response_model=List[FileResponse])
-async def list_files(
+def list_files(
+    response: Response,
     project_id: Optional[str] = Query(None, description="项目ID筛选"),
     stage: Optional[str] = Query(None, description="项目阶段筛选"),
     tags: Optional[str] = Query(None, description="标签筛选，逗号分隔"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头X-Next-Cursor"),
     file_service: FileService = Depends(get_file_service)
 ):
     """
     获取文件列表
+    
+    满页时在响应头X-Next-Cursor中返回下一页游标
     """
     try:
         tags_list = tags.split(",") if tags else None
@@ -204,17 +213,23 @@ async def list_files(
             tags=tags_list,
             search=search,
             page=page,
-            size=size
+            size=size,
+            cursor=cursor
         )
         
+        if len(files) == size:
+            response.headers["X-Next-Cursor"] = encode_cursor(files[-1].created_at, files[-1].id)
+        
         return files
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         app_logger.error(f"获取文件列表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取文件列表失败: {str(e)}")
 
 @router.get("/{file_id}", response_model=FileResponse)
-async def get_file(
+def get_file(
     file_id: str,
     file_service: FileService = Depends(get_file_service)
 ):
@@ -245,28 +260,22 @@ async def download_file(
     """
     try:
         # 获取文件记录
-        file_record = file_service.get_file_by_id(file_id)
+        file_record = await asyncio.to_thread(file_service.get_file_by_id, file_id)
         if not file_record:
             raise HTTPException(status_code=404, detail="文件不存在")
         
-        # 从本地存储获取文件 - 注意：这里不要使用await，因为download_file返回的是AsyncIterator
-        file_data = storage_service.download_file(
-            object_name=file_record.stored_name
-        )
+        file_path = storage_service.get_file_path(file_record.stored_name)
+        if not file_path.is_file():
+            raise HTTPException(status_code=404, detail="文件不存在")
         
         # 更新下载次数
-        file_service.increment_download_count(file_id)
-        
-        # 处理文件名编码问题
-        import urllib.parse
-        encoded_filename = urllib.parse.quote(file_record.original_name.encode('utf-8'))
+        await file_service.increment_download_count(file_id)
         
-        return StreamingResponse(
-            file_data,
+        # 直接由sendfile发送文件内容，文件名编码由FileResponse处理
+        return StarletteFileResponse(
+            file_path,
             media_type=file_record.file_type,
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-            }
+            filename=file_record.original_name
         )
         
     except HTTPException:
@@ -286,24 +295,22 @@ async def preview_file(
     """
     try:
         # 获取文件记录
-        file_record = await file_service.get_file_by_id(file_id)
+        file_record = await asyncio.to_thread(file_service.get_file_by_id, file_id)
         if not file_record:
             raise HTTPException(status_code=404, detail="文件不存在")
         
-        # 从本地存储获取文件
-        file_data = await storage_service.download_file(
-            object_name=file_record.stored_name
-        )
+        file_path = storage_service.get_file_path(file_record.stored_name)
+        if not file_path.is_file():
+            raise HTTPException(status_code=404, detail="文件不存在")
         
         # 更新查看次数
         await file_service.increment_view_count(file_id)
         
-        return StreamingResponse(
-            file_data,
+        return StarletteFileResponse(
+            file_path,
             media_type=file_record.file_type,
-            headers={
-                "Content-Disposition": f"inline; filename={file_record.original_name}"
-            }
+            filename=file_record.original_name,
+            content_disposition_type="inline"
         )
         
     except HTTPException:
@@ -313,7 +320,7 @@ async def preview_file(
         raise HTTPException(status_code=500, detail=f"文件预览失败: {str(e)}")
 
 @router.put("/{file_id}", response_model=FileResponse)
-async def update_file(
+def update_file(
     file_id: str,
     file_update: FileUpdate,
     file_service: FileService = Depends(get_file_service)
@@ -345,7 +352,7 @@ async def delete_file(
     """
     try:
         # 获取文件记录
-        file_record = file_service.get_file_by_id(file_id)
+        file_record = await asyncio.to_thread(file_service.get_file_by_id, file_id)
         if not file_record:
             raise HTTPException(status_code=404, detail="文件不存在")
         
@@ -371,7 +378,7 @@ async def delete_file(
             app_logger.error(f"🤖 删除文件向量时出错: {vector_error}")
         
         # 从数据库删除记录
-        file_service.delete_file(file_id)
+        await asyncio.to_thread(file_service.delete_file, file_id)
         
         app_logger.info(f"文件删除成功: {file_record.original_name}")
         
@@ -394,20 +401,18 @@ async def extract_file_content(
     """
     try:
         # 获取文件记录
-        file_record = await file_service.get_file_by_id(file_id)
+        file_record = await asyncio.to_thread(file_service.get_file_by_id, file_id)
         if not file_record:
             raise HTTPException(status_code=404, detail="文件不存在")
         
-        # 从本地存储获取文件
-        file_data = await storage_service.download_file(
-            object_name=file_record.stored_name
-        )
-        
         # 根据文件类型提取内容
-        content = await file_service.extract_content(file_data, file_record.file_type)
+        content = await file_service.extract_content(
+            storage_service.get_file_path(file_record.stored_name),
+            file_record.file_type
+        )
         
         # 更新文件内容到数据库
-        await file_service.update_file_content(file_id, content)
+        await asyncio.to_thread(file_service.update_file_content, file_id, content)
         
         return {"message": "内容提取成功", "content_length": len(content)}
         
@@ -418,7 +423,7 @@ async def extract_file_content(
         raise HTTPException(status_code=500, detail=f"内容提取失败: {str(e)}")
 
 @router.get("/stats/summary")
-async def get_file_stats(
+def get_file_stats(
     file_service: FileService = Depends(get_file_service)
 ):
     """
@@ -432,6 +437,46 @@ async def get_file_stats(
         app_logger.error(f"获取文件统计失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取文件统计失败: {str(e)}")
 
+def _collect_index_targets(
+    file_service: FileService,
+    project_id: Optional[str],
+    force_reindex: bool
+) -> List[Dict[str, Any]]:
+    """
+    查询需要索引的文件，并在当前线程内读出所需字段
+    
+    批量写入内容提交后ORM对象会过期，之后在事件循环中访问属性会逐个触发刷新查询，
+    因此这里直接转换为普通字典
+    
+    Args:
+        file_service: 文件服务
+        project_id: 项目ID，如果指定则只索引该项目的文件
+        force_reindex: 是否包含已处理的文件
+        
+    Returns:
+        List[Dict[str, Any]]: 文件字段列表
+    """
+    if project_id:
+        files = file_service.get_files_by_project(project_id)
+    else:
+        files = file_service.get_all_files() if force_reindex else file_service.get_all_unprocessed_files()
+    
+    return [
+        {
+            "id": file_record.id,
+            "stored_name": file_record.stored_name,
+            "original_name": file_record.original_name,
+            "file_type": file_record.file_type,
+            "project_id": file_record.project_id,
+            "stage": file_record.stage,
+            "tags": file_record.tags or [],
+            "created_at": file_record.created_at,
+        }
+        for file_record in files
+        # 跳过已处理的文件（除非强制重新索引）
+        if force_reindex or not file_record.is_processed
+    ]
+
 @router.post("/batch-index")
 async def batch_index_files(
     project_id: Optional[str] = None,
@@ -450,71 +495,75 @@ async def batch_index_files(
         from app.services.ai_service import ai_service
         
         # 获取需要索引的文件
-        if project_id:
-            files = file_service.get_files_by_project(project_id)
-        else:
-            files = file_service.get_all_unprocessed_files() if not force_reindex else file_service.get_all_files()
+        files = await asyncio.to_thread(_collect_index_targets, file_service, project_id, force_reindex)
         
         app_logger.info(f"🤖 开始批量索引，共 {len(files)} 个文件")
         
         indexed_count = 0
         failed_count = 0
         
-        for file_record in files:
-            try:
-                # 跳过已处理的文件（除非强制重新索引）
-                if file_record.is_processed and not force_reindex:
-                    continue
-                
-                app_logger.info(f"🤖 正在索引文件: {file_record.original_name}")
-                
-                # 从存储获取文件数据
-                file_data = await storage_service.download_file(
-                    object_name=file_record.stored_name
+        # 分批处理，同一时间内存中只保留一批文件的提取内容
+        for start in range(0, len(files), INDEX_BATCH_SIZE):
+            batch = files[start:start + INDEX_BATCH_SIZE]
+            indexed_ids = []
+            
+            # 并发提取本批文件内容（解析在进程池中执行）
+            contents = await asyncio.gather(*(
+                file_service.extract_content(
+                    storage_service.get_file_path(file_info["stored_name"]),
+                    file_info["file_type"]
                 )
-                
-                # 提取文件内容
-                content = await file_service.extract_content(file_data, file_record.file_type)
-                
-                if content and content.strip():
-                    # 更新文件内容到数据库
-                    await file_service.update_file_content(file_record.id, content)
-                    
-                    # 索引到向量数据库
-                    metadata = {
-                        "file_id": file_record.id,
-                        "project_id": file_record.project_id,
-                        "file_name": file_record.original_name,
-                        "file_type": file_record.file_type,
-                        "stage": file_record.stage,
-                        "tags": file_record.tags or [],
-                        "upload_time": file_record.created_at.isoformat() if file_record.created_at else datetime.now().isoformat(),
-                        "content_length": len(content)
-                    }
-                    
-                    document_id = f"file_{file_record.id}"
-                    success = await ai_service.add_document_to_vector_db(
-                        content=content,
-                        file_id=file_record.id,
-                        file_name=file_record.original_name,
-                        project_id=file_record.project_id,
-                        metadata=metadata
-                    )
+                for file_info in batch
+            ))
+            
+            # 本批提取到的内容一次写入并提交
+            await asyncio.to_thread(file_service.update_file_contents_bulk, [
+                (file_info["id"], content)
+                for file_info, content in zip(batch, contents)
+                if content and content.strip()
+            ], INDEX_BATCH_SIZE)
+            
+            for file_info, content in zip(batch, contents):
+                try:
+                    app_logger.info(f"🤖 正在索引文件: {file_info['original_name']}")
                     
-                    if success:
-                        # 标记文件已处理
-                        file_service.mark_file_processed(file_record.id)
-                        indexed_count += 1
-                        app_logger.info(f"🤖 文件索引成功: {file_record.original_name}")
+                    if content and content.strip():
+                        # 索引到向量数据库
+                        metadata = {
+                            "file_id": file_info["id"],
+                            "project_id": file_info["project_id"],
+                            "file_name": file_info["original_name"],
+                            "file_type": file_info["file_type"],
+                            "stage": file_info["stage"],
+                            "tags": file_info["tags"],
+                            "upload_time": file_info["created_at"].isoformat() if file_info["created_at"] else datetime.now().isoformat(),
+                            "content_length": len(content)
+                        }
+                        
+                        success = await ai_service.add_document_to_vector_db(
+                            content=content,
+                            file_id=file_info["id"],
+                            file_name=file_info["original_name"],
+                            project_id=file_info["project_id"],
+                            metadata=metadata
+                        )
+                        
+                        if success:
+                            indexed_ids.append(file_info["id"])
+                            indexed_count += 1
+                            app_logger.info(f"🤖 文件索引成功: {file_info['original_name']}")
+                        else:
+                            failed_count += 1
+                            app_logger.warning(f"🤖 文件索引失败: {file_info['original_name']}")
                     else:
-                        failed_count += 1
-                        app_logger.warning(f"🤖 文件索引失败: {file_record.original_name}")
-                else:
-                    app_logger.warning(f"🤖 文件内容为空，跳过索引: {file_record.original_name}")
-                    
-            except Exception as file_error:
-                failed_count += 1
-                app_logger.error(f"🤖 处理文件失败: {file_record.original_name}, 错误: {str(file_error)}")
+                        app_logger.warning(f"🤖 文件内容为空，跳过索引: {file_info['original_name']}")
+                        
+                except Exception as file_error:
+                    failed_count += 1
+                    app_logger.error(f"🤖 处理文件失败: {file_info['original_name']}, 错误: {str(file_error)}")
+            
+            # 本批索引成功的文件一次性标记
+            await asyncio.to_thread(file_service.mark_files_processed, indexed_ids)
         
         app_logger.info(f"🤖 批量索引完成，成功: {indexed_count}, 失败: {failed_count}")
         
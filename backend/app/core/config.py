@@ -77,6 +77,7 @@ class Settings(BaseSettings):
     # Redis配置
     # ========================================
     REDIS_URL: str = "redis://:redis123@localhost:6379/0"
+    COUNTER_FLUSH_INTERVAL: int = 5  # 文件计数批量写回间隔（秒）
     
     # ========================================
     # 本地文件存储配置
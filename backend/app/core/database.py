@@ -5,6 +5,7 @@ from sqlalchemy.pool import StaticPool
 import os
 
 from app.core.config import settings
+from app.models.base import Base as ModelBase
 
 # 创建数据库引擎
 if str(settings.DATABASE_URL).startswith("sqlite"):
@@ -26,8 +27,9 @@ else:
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# 创建基础模型类
-Base = declarative_base()
+# 创建基础模型类，与app.models.base.Base共用同一个MetaData，
+# 一次create_all即可创建文件表和其他业务表
+Base = declarative_base(metadata=ModelBase.metadata)
 
 def get_db():
     """获取数据库会话"""
@@ -17,6 +17,9 @@ from app.core.config import settings
 from app.core.logging import setup_logging, app_logger
 from app.api.api_v1.api import api_router
 from app.services.ai_service import ai_service
+from app.services.counter_buffer import counter_buffer
+from app.services.file_service import shutdown_extract_pool
+from app.services.volcengine_client import volcengine_client
 
 
 # 配置matplotlib中文显示 - 暂时注释掉
@@ -31,6 +34,8 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     try:
         app_logger.info("🚀 AI项目管理系统 v0.1.0 启动中...")
+        # 启动文件计数的后台批量写回
+        counter_buffer.start()
         app_logger.info("✅ 应用启动完成")
         yield
     except Exception as e:
@@ -38,6 +43,9 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         app_logger.info("🛑 应用正在关闭...")
+        await counter_buffer.stop()
+        shutdown_extract_pool()
+        await volcengine_client.aclose()
 
 
 def create_application() -> FastAPI:
@@ -61,6 +69,8 @@ def create_application() -> FastAPI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            # 前端跨域读取文件列表的分页游标
+            expose_headers=["X-Next-Cursor"],
         )
     else:
         # 开发环境允许所有来源
@@ -70,6 +80,8 @@ def create_application() -> FastAPI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            # 前端跨域读取文件列表的分页游标
+            expose_headers=["X-Next-Cursor"],
         )
     
     # 注册API路由
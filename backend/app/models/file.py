@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Boolean, BigInteger
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Boolean, BigInteger, Index, DDL, event, text
 from sqlalchemy.sql import func
 from datetime import datetime
 from typing import List, Optional
@@ -6,9 +6,43 @@ import uuid
 
 from app.core.database import Base
 
+# 关键词搜索按ilike子串匹配（中文没有分词，全文检索无法匹配词内子串），
+# PostgreSQL下由pg_trgm三元组GIN索引加速，需先启用扩展
+ENABLE_PG_TRGM = DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+
+# 参与关键词搜索的列
+SEARCH_COLUMNS = ("original_name", "description", "content")
+
 class FileRecord(Base):
     """文件记录模型"""
     __tablename__ = "files"
+    __table_args__ = (
+        # 关键词搜索（col ILIKE '%kw%'）使用的三元组索引，每列一个，OR条件可合并为BitmapOr
+        *(
+            Index(
+                f"idx_files_{column}_trgm", column,
+                postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"},
+            ).ddl_if(dialect="postgresql")
+            for column in SEARCH_COLUMNS
+        ),
+        # 标签包含查询（CAST(tags AS JSONB) @> ...）使用的GIN索引，表达式需与查询保持一致
+        Index(
+            "idx_files_tags_gin", text("(CAST(tags AS JSONB)) jsonb_path_ops"), postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        # 列表/搜索/统计的常用筛选条件，仅索引未删除的记录（部分索引）
+        Index(
+            "ix_file_active_proj_created", "project_id", text("created_at DESC"),
+            postgresql_where=text("is_deleted = false"), sqlite_where=text("is_deleted = 0"),
+        ),
+        Index(
+            "ix_file_active_stage", "stage",
+            postgresql_where=text("is_deleted = false"), sqlite_where=text("is_deleted = 0"),
+        ),
+        Index(
+            "ix_file_active_view", text("view_count DESC"),
+            postgresql_where=text("is_deleted = false"), sqlite_where=text("is_deleted = 0"),
+        ),
+    )
     
     # 基本信息
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -55,7 +89,7 @@ class FileRecord(Base):
     parent_id = Column(String, comment="父文件ID")
     
     # 元数据
-    file_metadata = Column(JSON, default=lambda: {}, comment="额外元数据")
+    file_metadata = Column(JSON, nullable=False, default=dict, server_default=text("'{}'"), comment="额外元数据")
     
     def __repr__(self):
         return f"<FileRecord(id={self.id}, name={self.original_name})>"
@@ -89,6 +123,9 @@ class FileRecord(Base):
             "file_metadata": self.file_metadata
         }
 
+# 建表前启用pg_trgm，三元组索引依赖该扩展
+event.listen(FileRecord.__table__, "before_create", ENABLE_PG_TRGM)
+
 class FileVersion(Base):
     """文件版本模型"""
     __tablename__ = "file_versions"
@@ -170,4 +207,4 @@ class FileComment(Base):
     is_deleted = Column(Boolean, default=False, comment="是否删除")
     
     def __repr__(self):
-        return f"<FileComment(id={self.id}, file_id={self.file_id})>" 
\ No newline at end of file
+        return f"<FileComment(id={self.id}, file_id={self.file_id})>" 
@@ -86,6 +86,11 @@ class FileResponse(FileBase):
     # 元数据
     file_metadata: Dict[str, Any] = Field(default_factory=dict, description="额外元数据")
     
+    @validator('file_metadata', pre=True)
+    def default_file_metadata(cls, v):
+        # 兼容历史数据中为NULL的元数据
+        return v if v is not None else {}
+    
     class Config:
         from_attributes = True
 
@@ -23,7 +23,7 @@ from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
-from .volcengine_client import volcengine_client
+from .volcengine_client import EMBEDDING_DIM, volcengine_client
 from ..core.model_config import model_manager
 
 # 配置日志
@@ -51,7 +51,12 @@ class DocumentSearchResult(BaseModel):
     metadata: Dict[str, Any] = {}
 
 class VolcengineEmbeddings(Embeddings):
-    """豆包Embedding模型LangChain适配器"""
+    """
+    豆包Embedding模型LangChain适配器
+    
+    客户端返回只读的float32 ndarray，这里统一转换为List[float]，符合LangChain Embeddings接口，
+    向量库可以放心地原地修改（如归一化）
+    """
     
     def __init__(self):
         """初始化豆包Embedding"""
@@ -62,38 +67,41 @@ class VolcengineEmbeddings(Embeddings):
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """批量嵌入文档"""
         try:
-            embeddings = []
-            for text in texts:
-                embedding = self.client.get_embedding(text)
-                embeddings.append(embedding)
+            embeddings = self.client.get_embeddings(texts)
             logger.info(f"✅ 成功嵌入 {len(texts)} 个文档")
-            return embeddings
+            return [embedding.tolist() for embedding in embeddings]
         except Exception as e:
             logger.error(f"文档嵌入失败: {e}")
             # 返回零向量作为降级
-            return [[0.0] * 2560 for _ in texts]
+            return [[0.0] * EMBEDDING_DIM for _ in texts]
     
     def embed_query(self, text: str) -> List[float]:
         """嵌入查询文本"""
         try:
             embedding = self.client.get_embedding(text)
             logger.info(f"✅ 成功嵌入查询文本")
-            return embedding
+            return embedding.tolist()
         except Exception as e:
             logger.error(f"查询嵌入失败: {e}")
-            return [0.0] * 2560
+            return [0.0] * EMBEDDING_DIM
     
     async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
         """异步批量嵌入文档"""
-        return await asyncio.get_event_loop().run_in_executor(
-            None, self.embed_documents, texts
-        )
+        try:
+            embeddings = await self.client.aembed_many(texts)
+            logger.info(f"✅ 成功嵌入 {len(texts)} 个文档")
+            return [embedding.tolist() for embedding in embeddings]
+        except Exception as e:
+            logger.error(f"文档嵌入失败: {e}")
+            return [[0.0] * EMBEDDING_DIM for _ in texts]
     
     async def aembed_query(self, text: str) -> List[float]:
         """异步嵌入查询文本"""
-        return await asyncio.get_event_loop().run_in_executor(
-            None, self.embed_query, text
-        )
+        try:
+            return (await self.client.aget_embedding(text)).tolist()
+        except Exception as e:
+            logger.error(f"查询嵌入失败: {e}")
+            return [0.0] * EMBEDDING_DIM
 
 class AIService:
     """AI服务类 - 基于豆包Embedding + FAISS + LangChain最新架构"""
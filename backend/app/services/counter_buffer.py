@@ -0,0 +1,162 @@
+"""
+文件计数缓冲
+查看/下载次数先累加到Redis，由后台任务定期批量写回数据库
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+import redis.asyncio as redis
+from loguru import logger
+from sqlalchemy import and_, bindparam, func, update
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.file import FileRecord
+
+# Redis哈希键，字段格式为 "{kind}:{file_id}"
+COUNTER_KEY = "file_counter_deltas"
+
+# 计数类型 -> FileRecord列名
+COUNTER_COLUMNS = {
+    "view": "view_count",
+    "download": "download_count",
+}
+
+# Redis连接/读写超时（秒），Redis不可达时尽快回退到直接写库
+REDIS_TIMEOUT = 0.3
+
+# 写回连续失败时的最大重试间隔（秒）
+MAX_FLUSH_BACKOFF = 300
+
+# 原子地取出并清空累计的增量，避免读取与删除之间的计数丢失
+_DRAIN_SCRIPT = """
+local deltas = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return deltas
+"""
+
+
+class CounterBuffer:
+    """文件计数缓冲服务"""
+
+    def __init__(self):
+        self._redis = redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=REDIS_TIMEOUT,
+            socket_timeout=REDIS_TIMEOUT,
+        )
+        self._drain = self._redis.register_script(_DRAIN_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+
+    async def bump(self, kind: str, file_id: str) -> bool:
+        """
+        累加一次计数
+
+        Args:
+            kind: 计数类型（view/download）
+            file_id: 文件ID
+
+        Returns:
+            bool: 是否已写入缓冲，Redis不可用时返回False，由调用方直接更新数据库
+        """
+        try:
+            await self._redis.hincrby(COUNTER_KEY, f"{kind}:{file_id}", 1)
+            return True
+        except Exception as e:
+            logger.warning(f"计数缓冲不可用，改为直接写库: {e}")
+            return False
+
+    async def flush(self) -> int:
+        """
+        将累计的增量批量写回数据库
+
+        Returns:
+            int: 写回的计数条目数
+        """
+        raw = await self._drain(keys=[COUNTER_KEY])
+        if not raw:
+            return 0
+
+        grouped: Dict[str, List[Dict]] = {}
+        for field, delta in zip(raw[::2], raw[1::2]):
+            kind, _, file_id = field.partition(":")
+            column = COUNTER_COLUMNS.get(kind)
+            if column:
+                grouped.setdefault(column, []).append({"b_id": file_id, "delta": int(delta)})
+
+        try:
+            await asyncio.to_thread(self._apply, grouped)
+        except Exception:
+            # 写库失败时把增量放回Redis，等待下一轮重试
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for field, delta in zip(raw[::2], raw[1::2]):
+                    pipe.hincrby(COUNTER_KEY, field, int(delta))
+                await pipe.execute()
+            raise
+
+        # 计数已变化，移除对应文件的记录缓存（延迟导入，避免与file_cache循环引用）
+        from app.services.file_cache import file_cache
+        await asyncio.to_thread(
+            file_cache.invalidate, *{params["b_id"] for rows in grouped.values() for params in rows}
+        )
+
+        return sum(len(params) for params in grouped.values())
+
+    @staticmethod
+    def _apply(grouped: Dict[str, List[Dict]]) -> None:
+        """在一个事务内按列批量执行 UPDATE（executemany）"""
+        table = FileRecord.__table__
+        with engine.begin() as conn:
+            for column, params in grouped.items():
+                stmt = (
+                    update(table)
+                    .where(and_(table.c.id == bindparam("b_id"), table.c.is_deleted == False))
+                    .values({column: func.coalesce(table.c[column], 0) + bindparam("delta")})
+                )
+                conn.execute(stmt, params)
+
+    async def _run(self) -> None:
+        """后台定期写回，连续失败时按指数退避延长间隔，只在首次失败和恢复时记录日志"""
+        delay = settings.COUNTER_FLUSH_INTERVAL
+        failing = False
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.flush()
+            except Exception as e:
+                if not failing:
+                    logger.warning(f"计数写回失败，将退避重试: {e}")
+                failing = True
+                delay = min(delay * 2, MAX_FLUSH_BACKOFF)
+                continue
+            
+            if failing:
+                logger.info("计数写回已恢复")
+                failing = False
+            delay = settings.COUNTER_FLUSH_INTERVAL
+
+    def start(self) -> None:
+        """启动后台写回任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写回剩余增量"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"计数写回失败: {e}")
+
+
+# 全局计数缓冲实例
+counter_buffer = CounterBuffer()
@@ -0,0 +1,149 @@
+"""
+文件记录缓存
+单文件记录缓存在进程内，每个文件在Redis中有一个版本号，文件修改时递增；
+命中缓存时核对版本号，其他工作进程的修改会让本进程的旧条目立即失效
+"""
+
+import threading
+import time
+from typing import Optional
+
+import redis
+from cachetools import TTLCache
+from loguru import logger
+
+from app.core.config import settings
+from app.schemas.file import FileResponse
+from app.services.counter_buffer import REDIS_TIMEOUT
+
+# Redis版本号键，值为文件被修改的次数
+VERSION_KEY = "file_cache_version:{}"
+
+# 版本号键的过期时间（秒），须远大于CACHE_TTL，键过期后不会与仍在缓存中的旧条目版本号重合
+VERSION_TTL = 24 * 3600
+
+# 缓存过期时间（秒）
+CACHE_TTL = 60
+
+# Redis请求失败后暂停访问的时间（秒），期间缓存直接视为未命中，避免每次请求都等待连接超时
+RETRY_INTERVAL = 5
+
+
+class FileRecordCache:
+    """文件记录缓存服务"""
+
+    def __init__(self):
+        # 文件ID -> (版本号, 文件记录)
+        self._cache: TTLCache = TTLCache(maxsize=10_000, ttl=CACHE_TTL)
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=REDIS_TIMEOUT,
+            socket_timeout=REDIS_TIMEOUT,
+        )
+        self._retry_at = 0.0
+        self._failing = False
+
+    def version(self, file_id: str) -> Optional[int]:
+        """
+        读取文件的当前版本号，查询数据库之前调用
+
+        Args:
+            file_id: 文件ID
+
+        Returns:
+            Optional[int]: 版本号，Redis不可用时为None（此时不使用缓存）
+        """
+        if time.monotonic() < self._retry_at:
+            return None
+
+        try:
+            value = self._redis.get(VERSION_KEY.format(file_id))
+        except Exception as e:
+            self._on_redis_error(e)
+            return None
+
+        self._on_redis_ok()
+        return int(value or 0)
+
+    def get(self, file_id: str, version: Optional[int]) -> Optional[FileResponse]:
+        """
+        读取缓存的文件记录，版本号不一致时视为未命中
+
+        Args:
+            file_id: 文件ID
+            version: version()返回的当前版本号
+
+        Returns:
+            Optional[FileResponse]: 缓存的文件记录，未命中时为None
+        """
+        if version is None:
+            return None
+
+        with self._lock:
+            entry = self._cache.get(file_id)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def put(self, file_id: str, response: FileResponse, version: Optional[int]) -> None:
+        """
+        写入文件记录缓存
+
+        Args:
+            file_id: 文件ID
+            response: 文件记录
+            version: 查询数据库之前读取的版本号；查询期间文件被修改时版本号已递增，
+                该条目下次命中时会被判定为过期
+        """
+        if version is None:
+            return
+
+        with self._lock:
+            self._cache[file_id] = (version, response)
+
+    def invalidate(self, *file_ids: str) -> None:
+        """
+        移除本进程的缓存条目，并递增Redis中的版本号使其他工作进程的条目失效
+
+        Args:
+            file_ids: 文件ID
+        """
+        if not file_ids:
+            return
+
+        with self._lock:
+            for file_id in file_ids:
+                self._cache.pop(file_id, None)
+
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for file_id in file_ids:
+                key = VERSION_KEY.format(file_id)
+                pipe.incr(key)
+                pipe.expire(key, VERSION_TTL)
+            pipe.execute()
+        except Exception as e:
+            # 其他进程的旧条目最多保留CACHE_TTL秒
+            self._on_redis_error(e)
+            return
+
+        self._on_redis_ok()
+
+    def _on_redis_error(self, error: Exception) -> None:
+        """暂停访问Redis RETRY_INTERVAL秒，只在首次失败时记录日志"""
+        if not self._failing:
+            logger.warning(f"文件缓存无法访问Redis，暂时停用缓存: {error}")
+        self._failing = True
+        self._retry_at = time.monotonic() + RETRY_INTERVAL
+
+    def _on_redis_ok(self) -> None:
+        """Redis访问恢复时记录日志"""
+        if self._failing:
+            logger.info("文件缓存已恢复访问Redis")
+            self._failing = False
+
+
+# 全局文件记录缓存实例
+file_cache = FileRecordCache()
@@ -1,18 +1,225 @@
 import asyncio
+import base64
 import io
-from typing import List, Optional, Dict, Any
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Union, Tuple
 from pathlib import Path
 from datetime import datetime, timedelta
 import mimetypes
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from cachetools import TTLCache
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import and_, or_, func, desc, cast, update, literal, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
 from loguru import logger
 
 from app.models.file import FileRecord, FileVersion, FileShare, FileComment
 from app.schemas.file import FileCreate, FileUpdate, FileResponse, FileStatsResponse
 from app.core.database import get_db
-from app.utils.file_utils import extract_text_from_pdf, extract_text_from_docx, extract_text_from_xlsx
+from app.services.counter_buffer import counter_buffer
+from app.services.file_cache import file_cache
+from app.utils.file_utils import extract_text_from_pdf, extract_text_from_docx, extract_text_from_xlsx, get_file_type
+
+# 内容提取的文件大小上限（字节），超出则跳过解析
+MAX_EXTRACT_SIZE = 50 * 1024 * 1024  # 50MB
+
+def _extract_plain_text(file_stream) -> str:
+    """读取纯文本内容（最多读取MAX_EXTRACT_SIZE字节）"""
+    return file_stream.read(MAX_EXTRACT_SIZE).decode("utf-8", errors="ignore")
+
+# MIME类型 -> 内容提取函数
+_EXTRACTORS = {
+    "application/pdf": extract_text_from_pdf,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": extract_text_from_docx,
+    "application/msword": extract_text_from_docx,
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": extract_text_from_xlsx,
+    "application/vnd.ms-excel": extract_text_from_xlsx,
+}
+
+# MIME类型前缀 -> 内容提取函数（精确匹配不到时按前缀查找）
+_PREFIX_EXTRACTORS = (
+    ("text/", _extract_plain_text),
+)
+
+@lru_cache(maxsize=256)
+def _resolve_extractor(file_type: str):
+    """按MIME类型查找内容提取函数（忽略charset等参数），不支持时返回None"""
+    mime_type = file_type.split(";", 1)[0].strip().lower()
+    extractor = _EXTRACTORS.get(mime_type)
+    if extractor is None:
+        extractor = next((fn for prefix, fn in _PREFIX_EXTRACTORS if mime_type.startswith(prefix)), None)
+    return extractor
+
+def _run_extractor(extractor, source: Union[bytes, str, Path]) -> str:
+    """
+    执行内容提取（在线程池中运行）
+    
+    传入文件路径时直接把文件句柄交给解析器，按需从磁盘（系统页缓存）读取，
+    不再把整个文件复制到进程内存中。
+    """
+    if isinstance(source, bytes):
+        return extractor(io.BytesIO(source))
+    
+    with open(source, "rb") as f:
+        return extractor(f)
+
+# PDF/DOCX/XLSX解析是CPU密集型，放到进程池执行，避免受GIL限制拖慢其他请求
+# 进程数默认比CPU核数少一个，给事件循环和同机其他服务留出余量
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# 不用fork启动子进程：服务进程中已有事件循环、数据库连接池和Redis连接，fork会把这些状态复制进子进程
+_EXTRACT_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    """获取内容提取进程池（首次使用时创建）"""
+    global _extract_pool
+    if _extract_pool is None:
+        with _extract_pool_lock:
+            if _extract_pool is None:
+                _extract_pool = ProcessPoolExecutor(
+                    max_workers=EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context(_EXTRACT_START_METHOD),
+                )
+    return _extract_pool
+
+def _discard_extract_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    丢弃已损坏的进程池（子进程被杀死或崩溃后整个池不可再用），下次使用时重新创建
+    
+    Args:
+        pool: 出现BrokenProcessPool的进程池，只有它仍是当前全局进程池时才会被丢弃
+    """
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is pool:
+            _extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def _run_in_extract_pool(extractor, source: Union[bytes, str, Path]) -> str:
+    """
+    在内容提取进程池中执行提取，进程池损坏时重建并重试一次
+    
+    Args:
+        extractor: 内容提取函数
+        source: 文件内容或本地文件路径
+        
+    Returns:
+        str: 提取的文本
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = _get_extract_pool()
+        try:
+            return await loop.run_in_executor(pool, _run_extractor, extractor, source)
+        except BrokenProcessPool:
+            _discard_extract_pool(pool)
+            if attempt:
+                raise
+            logger.warning("内容提取进程池已损坏，重建后重试")
+
+def shutdown_extract_pool() -> None:
+    """关闭内容提取进程池"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False, cancel_futures=True)
+            _extract_pool = None
+
+def extract_texts_parallel(files: List[Union[str, Path]]) -> Dict[Path, str]:
+    """
+    并行提取多个本地文件的文本内容（使用内容提取进程池）
+    
+    Args:
+        files: 文件路径列表，按扩展名判断文件类型
+        
+    Returns:
+        Dict[Path, str]: 文件路径 -> 提取的文本，不支持的类型或提取失败时为空字符串
+    """
+    results: Dict[Path, str] = {}
+    jobs = {}
+    
+    for source in files:
+        path = Path(source)
+        extractor = _resolve_extractor(get_file_type(path.name) or "")
+        if extractor is None:
+            results[path] = ""
+            continue
+        jobs[path] = extractor
+    
+    # 进程池损坏时，重建进程池并把受影响的文件重新提交一次
+    for attempt in range(2):
+        pool = _get_extract_pool()
+        futures = {}
+        broken = {}
+        
+        for path, extractor in jobs.items():
+            try:
+                futures[pool.submit(_run_extractor, extractor, path)] = path
+            except BrokenProcessPool:
+                broken[path] = extractor
+        
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except BrokenProcessPool:
+                broken[path] = jobs[path]
+            except Exception as e:
+                logger.error(f"内容提取失败 {path}: {e}")
+                results[path] = ""
+        
+        if not broken:
+            break
+        
+        _discard_extract_pool(pool)
+        if attempt:
+            for path in broken:
+                logger.error(f"内容提取失败 {path}: 进程池已损坏")
+                results[path] = ""
+        else:
+            logger.warning(f"内容提取进程池已损坏，重建后重试 {len(broken)} 个文件")
+            jobs = broken
+    
+    return results
+
+# 文件统计缓存（30秒），文件增删改时清空
+_stats_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+_stats_cache_lock = threading.Lock()
+
+def _invalidate_stats_cache() -> None:
+    """清空文件统计缓存"""
+    with _stats_cache_lock:
+        _stats_cache.clear()
+
+def encode_cursor(created_at: datetime, file_id: str) -> str:
+    """
+    生成分页游标（最后一条记录的创建时间和ID）
+    
+    Args:
+        created_at: 创建时间
+        file_id: 文件ID
+        
+    Returns:
+        str: base64编码的游标
+    """
+    raw = f"{created_at.isoformat()}|{file_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解析分页游标，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, file_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), file_id
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
 
 class FileService:
     """文件服务"""
@@ -20,6 +227,52 @@ class FileService:
     def __init__(self, db: Session):
         self.db = db
     
+    @property
+    def _is_postgres(self) -> bool:
+        """当前会话是否连接PostgreSQL"""
+        return self.db.get_bind().dialect.name == "postgresql"
+    
+    def _apply_tags_filter(self, query, tags: List[str]):
+        """
+        按标签筛选（需同时包含全部标签）
+        
+        PostgreSQL下合并为一个jsonb包含谓词（@>），只需一次索引探测；
+        其他数据库逐个标签过滤。
+        """
+        if self._is_postgres:
+            return query.filter(cast(FileRecord.tags, JSONB).contains(tags))
+        for tag in tags:
+            query = query.filter(FileRecord.tags.contains([tag]))
+        return query
+    
+    def _search_filter(self, keyword: str):
+        """
+        构造关键词搜索条件（文件名、描述、内容的子串匹配）
+        
+        PostgreSQL下由各列的pg_trgm GIN索引加速，中文词内子串（如"报告"匹配"项目报告"）和英文前缀都能命中。
+        """
+        return or_(
+            FileRecord.original_name.ilike(f"%{keyword}%"),
+            FileRecord.description.ilike(f"%{keyword}%"),
+            FileRecord.content.ilike(f"%{keyword}%")
+        )
+    
+    def _keyset_filter(self, cursor: str, descending: bool = True):
+        """
+        构造键集分页条件：（创建时间, ID）位于游标之后
+        
+        SQLite以文本保存时间，CURRENT_TIMESTAMP写入的值不带微秒，两侧统一格式后再比较。
+        """
+        last_created_at, last_id = _decode_cursor(cursor)
+        created_at = FileRecord.created_at
+        bound = literal(last_created_at, FileRecord.created_at.type)
+        if not self._is_postgres:
+            created_at = func.strftime("%Y-%m-%d %H:%M:%f", created_at)
+            bound = func.strftime("%Y-%m-%d %H:%M:%f", bound)
+        position = tuple_(created_at, FileRecord.id)
+        last = tuple_(bound, literal(last_id))
+        return position < last if descending else position > last
+    
     def create_file(self, file_create: FileCreate) -> FileResponse:
         """
         创建文件记录
@@ -31,11 +284,6 @@ class FileService:
             FileResponse: 创建的文件记录
         """
         try:
-            logger.info(f"🔥 FileService.create_file - 开始创建文件记录")
-            logger.info(f"🔥 FileCreate数据: {file_create}")
-            
-            # 创建文件记录
-            logger.info(f"🔥 开始创建FileRecord对象")
             file_record = FileRecord(
                 original_name=file_create.original_name,
                 stored_name=file_create.stored_name,
@@ -48,69 +296,61 @@ class FileService:
                 tags=file_create.tags,
                 description=file_create.description,
                 uploaded_by=file_create.uploaded_by,
-                is_public=file_create.is_public
+                is_public=file_create.is_public,
+                # 未设置的可空列显式置为None，否则序列化时会逐个触发延迟加载（额外的SELECT）
+                content=None,
+                content_type=None,
+                content_length=None,
+                updated_by=None,
+                parent_id=None
             )
-            logger.info(f"🔥 FileRecord对象创建成功: {file_record}")
-            
-            logger.info(f"🔥 开始添加到数据库会话")
             self.db.add(file_record)
             
-            logger.info(f"🔥 开始提交数据库事务")
-            self.db.commit()
-            
-            logger.info(f"🔥 开始刷新文件记录")
-            self.db.refresh(file_record)
-            
-            logger.info(f"🔥 文件记录创建成功: {file_record.id}")
+            # flush时通过INSERT ... RETURNING回填created_at等数据库端默认值，
+            # 其余列均已在对象上赋值，序列化无需再查询数据库
+            self.db.flush()
             
-            # 确保file_metadata是字典类型
-            logger.info(f"🔥 检查file_metadata类型: {type(file_record.file_metadata)}")
-            if not isinstance(file_record.file_metadata, dict):
-                logger.warning(f"🔥 file_metadata不是字典类型，将设置为空字典")
-                file_record.file_metadata = {}
-            else:
-                logger.info(f"🔥 file_metadata是字典类型: {file_record.file_metadata}")
-                
-            logger.info(f"🔥 开始创建FileResponse对象")
+            # 提交后对象属性会过期，因此在提交前完成序列化
             response = FileResponse.model_validate(file_record)
-            logger.info(f"🔥 FileResponse对象创建成功: {response.id}")
+            self.db.commit()
+            _invalidate_stats_cache()
             
+            logger.debug("文件记录创建成功: {}", response.id)
             return response
             
-        except Exception as e:
-            logger.error(f"🔥 FileService.create_file - 创建文件记录失败: {e}")
-            logger.error(f"🔥 异常类型: {type(e).__name__}")
-            logger.error(f"🔥 异常详情: {str(e)}")
-            import traceback
-            logger.error(f"🔥 异常堆栈: {traceback.format_exc()}")
-            
+        except Exception:
+            logger.exception("创建文件记录失败")
             self.db.rollback()
-            logger.info(f"🔥 数据库事务已回滚")
             raise
     
     def get_file_by_id(self, file_id: str) -> Optional[FileResponse]:
         """
         根据ID获取文件
         
+        结果缓存在进程内，命中时核对Redis中的版本号，文件变更后所有进程的旧条目立即失效
+        
         Args:
             file_id: 文件ID
             
         Returns:
             Optional[FileResponse]: 文件记录
         """
+        version = file_cache.version(file_id)
+        cached = file_cache.get(file_id, version)
+        if cached is not None:
+            return cached
+        
         try:
-            file_record = self.db.query(FileRecord).filter(
+            file_record = self.db.query(FileRecord).options(defer(FileRecord.content)).filter(
                 FileRecord.id == file_id
             ).first()
             
             if not file_record:
                 return None
             
-            # 确保file_metadata是字典类型
-            if not isinstance(file_record.file_metadata, dict):
-                file_record.file_metadata = {}
-                
-            return FileResponse.model_validate(file_record)
+            response = FileResponse.model_validate(file_record)
+            file_cache.put(file_id, response, version)
+            return response
             
         except Exception as e:
             logger.error(f"获取文件记录失败: {e}")
@@ -123,11 +363,15 @@ class FileService:
         tags: Optional[List[str]] = None,
         search: Optional[str] = None,
         page: int = 1,
-        size: int = 20
+        size: int = 20,
+        cursor: Optional[str] = None
     ) -> List[FileResponse]:
         """
         获取文件列表
         
+        传入cursor时按（创建时间, ID）做键集分页，忽略page；
+        下一页游标可由最后一条记录通过 encode_cursor 生成。
+        
         Args:
             project_id: 项目ID筛选
             stage: 项目阶段筛选
@@ -135,12 +379,14 @@ class FileService:
             search: 搜索关键词
             page: 页码
             size: 每页数量
+            cursor: 分页游标
             
         Returns:
             List[FileResponse]: 文件列表
         """
         try:
-            query = self.db.query(FileRecord).filter(FileRecord.is_deleted == False)
+            # 列表不返回提取的正文，跳过加载大字段content
+            query = self.db.query(FileRecord).options(defer(FileRecord.content)).filter(FileRecord.is_deleted == False)
             
             # 项目ID筛选
             if project_id:
@@ -152,26 +398,19 @@ class FileService:
             
             # 标签筛选
             if tags:
-                for tag in tags:
-                    query = query.filter(FileRecord.tags.contains([tag]))
+                query = self._apply_tags_filter(query, tags)
             
             # 搜索筛选
             if search:
-                search_filter = or_(
-                    FileRecord.original_name.ilike(f"%{search}%"),
-                    FileRecord.description.ilike(f"%{search}%"),
-                    FileRecord.content.ilike(f"%{search}%")
-                )
-                query = query.filter(search_filter)
-            
-            # 分页
-            offset = (page - 1) * size
-            files = query.order_by(desc(FileRecord.created_at)).offset(offset).limit(size).all()
+                query = query.filter(self._search_filter(search))
             
-            # 确保每个文件的file_metadata是字典类型
-            for file_record in files:
-                if not isinstance(file_record.file_metadata, dict):
-                    file_record.file_metadata = {}
+            # 分页：有游标时走键集分页，避免深分页扫描并丢弃OFFSET行
+            query = query.order_by(desc(FileRecord.created_at), desc(FileRecord.id))
+            if cursor:
+                query = query.filter(self._keyset_filter(cursor))
+            else:
+                query = query.offset((page - 1) * size)
+            files = query.limit(size).all()
             
             return [FileResponse.model_validate(file) for file in files]
             
@@ -217,15 +456,14 @@ class FileService:
             
             file_record.updated_at = datetime.now()
             
+            # 字段均已在内存中，提交前序列化，省去refresh的额外查询
+            response = FileResponse.model_validate(file_record)
             self.db.commit()
-            self.db.refresh(file_record)
-            
-            # 确保file_metadata是字典类型
-            if not isinstance(file_record.file_metadata, dict):
-                file_record.file_metadata = {}
+            _invalidate_stats_cache()
+            file_cache.invalidate(file_id)
             
             logger.info(f"文件记录更新成功: {file_id}")
-            return FileResponse.model_validate(file_record)
+            return response
             
         except Exception as e:
             self.db.rollback()
@@ -257,6 +495,8 @@ class FileService:
             file_record.updated_at = datetime.now()
             
             self.db.commit()
+            _invalidate_stats_cache()
+            file_cache.invalidate(file_id)
             
             logger.info(f"文件记录删除成功: {file_id}")
             return True
@@ -266,108 +506,102 @@ class FileService:
             logger.error(f"删除文件记录失败: {e}")
             raise
     
-    def increment_view_count(self, file_id: str) -> bool:
+    async def increment_view_count(self, file_id: str) -> bool:
         """
         增加查看次数
         
+        计数先累加到Redis缓冲，由后台任务批量写回；Redis不可用时在线程中直接更新数据库
+        
         Args:
             file_id: 文件ID
             
         Returns:
             bool: 更新是否成功
         """
-        try:
-            file_record = self.db.query(FileRecord).filter(
-                and_(
-                    FileRecord.id == file_id,
-                    FileRecord.is_deleted == False
-                )
-            ).first()
-            
-            if not file_record:
-                return False
-            
-            file_record.view_count += 1
-            file_record.updated_at = datetime.now()
-            
-            self.db.commit()
-            
+        if await counter_buffer.bump("view", file_id):
             return True
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"更新查看次数失败: {e}")
-            raise
+        return await asyncio.to_thread(self._increment_counter, file_id, FileRecord.view_count)
     
-    def increment_download_count(self, file_id: str) -> bool:
+    async def increment_download_count(self, file_id: str) -> bool:
         """
         增加下载次数
         
+        计数先累加到Redis缓冲，由后台任务批量写回；Redis不可用时在线程中直接更新数据库
+        
         Args:
             file_id: 文件ID
             
         Returns:
             bool: 更新是否成功
         """
+        if await counter_buffer.bump("download", file_id):
+            return True
+        return await asyncio.to_thread(self._increment_counter, file_id, FileRecord.download_count)
+    
+    def _increment_counter(self, file_id: str, column) -> bool:
+        """直接在数据库中将计数列加一"""
         try:
-            file_record = self.db.query(FileRecord).filter(
-                and_(
-                    FileRecord.id == file_id,
-                    FileRecord.is_deleted == False
-                )
-            ).first()
-            
-            if not file_record:
-                return False
-            
-            file_record.download_count += 1
-            file_record.updated_at = datetime.now()
-            
+            result = self.db.execute(
+                update(FileRecord)
+                .where(and_(FileRecord.id == file_id, FileRecord.is_deleted == False))
+                .values({column: column + 1})
+                .execution_options(synchronize_session=False)
+            )
             self.db.commit()
+            file_cache.invalidate(file_id)
             
-            return True
+            return result.rowcount > 0
             
         except Exception as e:
             self.db.rollback()
-            logger.error(f"更新下载次数失败: {e}")
+            logger.error(f"更新计数失败: {e}")
             raise
     
-    async def extract_content(self, file_data: bytes, file_type: str) -> str:
+    async def extract_content(self, file_data: Union[bytes, str, Path], file_type: str) -> str:
         """
         提取文件内容
         
+        文档解析在进程池中执行，纯文本读取在线程池中执行，均不阻塞事件循环。
+        
         Args:
-            file_data: 文件数据
+            file_data: 文件数据或本地文件路径（推荐传路径，避免整文件读入内存）
             file_type: 文件类型
             
         Returns:
             str: 提取的文本内容
         """
         try:
-            content = ""
-            
-            if file_type == "application/pdf":
-                content = extract_text_from_pdf(io.BytesIO(file_data))
-            elif file_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]:
-                content = extract_text_from_docx(io.BytesIO(file_data))
-            elif file_type in ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"]:
-                content = extract_text_from_xlsx(io.BytesIO(file_data))
-            elif file_type.startswith("text/"):
-                content = file_data.decode("utf-8", errors="ignore")
-            else:
+            extractor = _resolve_extractor(file_type)
+            if extractor is None:
                 logger.warning(f"不支持的文件类型: {file_type}")
-                content = ""
+                return ""
             
-            return content
+            # 内存中的文本直接解码，无需提交到线程池
+            if extractor is _extract_plain_text and isinstance(file_data, bytes):
+                return file_data[:MAX_EXTRACT_SIZE].decode("utf-8", errors="ignore")
+            
+            # 文本文件只读取前MAX_EXTRACT_SIZE字节，其他格式超限直接跳过
+            if extractor is not _extract_plain_text:
+                file_size = len(file_data) if isinstance(file_data, bytes) else os.path.getsize(file_data)
+                if file_size > MAX_EXTRACT_SIZE:
+                    logger.warning(f"文件过大，跳过内容提取: {file_size} 字节")
+                    return ""
+            
+            if extractor is _extract_plain_text:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, _run_extractor, extractor, file_data)
+            return await _run_in_extract_pool(extractor, file_data)
             
         except Exception as e:
             logger.error(f"提取文件内容失败: {e}")
             return ""
     
-    async def update_file_content(self, file_id: str, content: str) -> bool:
+    def update_file_content(self, file_id: str, content: str) -> bool:
         """
         更新文件内容
         
+        批量处理时请使用 update_file_contents_bulk，避免逐个提交
+        
         Args:
             file_id: 文件ID
             content: 提取的内容
@@ -392,6 +626,8 @@ class FileService:
             file_record.updated_at = datetime.now()
             
             self.db.commit()
+            _invalidate_stats_cache()
+            file_cache.invalidate(file_id)
             
             logger.info(f"文件内容更新成功: {file_id}")
             return True
@@ -401,54 +637,107 @@ class FileService:
             logger.error(f"更新文件内容失败: {e}")
             raise
     
-    async def get_file_stats(self) -> FileStatsResponse:
+    def update_file_contents_bulk(self, items: List[Tuple[str, str]], batch_size: int = 50) -> int:
+        """
+        批量更新文件内容
+        
+        每batch_size条执行一次批量UPDATE并提交，减少逐条提交的开销
+        
+        Args:
+            items: (文件ID, 提取的内容) 列表
+            batch_size: 每批提交的条数
+            
+        Returns:
+            int: 更新的文件数量
+        """
+        try:
+            now = datetime.now()
+            for start in range(0, len(items), batch_size):
+                mappings = [
+                    {
+                        "id": file_id,
+                        "content": content,
+                        "content_length": len(content),
+                        "is_processed": True,
+                        "updated_at": now,
+                    }
+                    for file_id, content in items[start:start + batch_size]
+                ]
+                self.db.bulk_update_mappings(FileRecord, mappings)
+                self.db.commit()
+            
+            if items:
+                _invalidate_stats_cache()
+                file_cache.invalidate(*(file_id for file_id, _ in items))
+            
+            logger.info(f"批量更新文件内容成功: {len(items)} 个文件")
+            return len(items)
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"批量更新文件内容失败: {e}")
+            raise
+    
+    def get_file_stats(self) -> FileStatsResponse:
         """
         获取文件统计信息
         
+        结果缓存30秒，文件创建、更新、删除时失效
+        
         Returns:
             FileStatsResponse: 文件统计信息
         """
+        with _stats_cache_lock:
+            cached = _stats_cache.get("stats")
+        if cached is not None:
+            return cached
+        
         try:
-            # 总文件数和总大小
-            total_stats = self.db.query(
-                func.count(FileRecord.id).label('total_files'),
-                func.sum(FileRecord.file_size).label('total_size')
-            ).filter(FileRecord.is_deleted == False).first()
-            
-            total_files = total_stats.total_files or 0
-            total_size = total_stats.total_size or 0
-            
-            # 按阶段分组
-            stage_stats = self.db.query(
+            # 按（阶段, 类型）分组一次查询，汇总出总数、总大小及两种分组统计
+            grouped_stats = self.db.query(
                 FileRecord.stage,
-                func.count(FileRecord.id).label('count')
-            ).filter(FileRecord.is_deleted == False).group_by(FileRecord.stage).all()
-            
-            files_by_stage = {stage: count for stage, count in stage_stats}
-            
-            # 按类型分组
-            type_stats = self.db.query(
                 FileRecord.file_type,
-                func.count(FileRecord.id).label('count')
-            ).filter(FileRecord.is_deleted == False).group_by(FileRecord.file_type).all()
-            
-            files_by_type = {file_type: count for file_type, count in type_stats}
-            
-            # 最近上传的文件
-            recent_files = self.db.query(FileRecord).filter(
-                FileRecord.is_deleted == False
-            ).order_by(desc(FileRecord.created_at)).limit(5).all()
-            
-            recent_uploads = [FileResponse.model_validate(file) for file in recent_files]
-            
-            # 热门文件（按查看次数排序）
-            popular_files = self.db.query(FileRecord).filter(
-                FileRecord.is_deleted == False
-            ).order_by(desc(FileRecord.view_count)).limit(5).all()
+                func.count(FileRecord.id).label('count'),
+                func.sum(FileRecord.file_size).label('size')
+            ).filter(FileRecord.is_deleted == False).group_by(
+                FileRecord.stage, FileRecord.file_type
+            ).all()
             
-            popular_files_list = [FileResponse.model_validate(file) for file in popular_files]
+            total_files = 0
+            total_size = 0
+            files_by_stage: Dict[str, int] = {}
+            files_by_type: Dict[str, int] = {}
+            for stage, file_type, count, size in grouped_stats:
+                total_files += count
+                total_size += size or 0
+                files_by_stage[stage] = files_by_stage.get(stage, 0) + count
+                files_by_type[file_type] = files_by_type.get(file_type, 0) + count
+            
+            # 最近上传的文件和热门文件（按查看次数）：窗口函数排名，一次查询取出两组前5
+            ranked = self.db.query(
+                FileRecord.id.label('id'),
+                func.row_number().over(order_by=desc(FileRecord.created_at)).label('recent_rank'),
+                func.row_number().over(order_by=desc(FileRecord.view_count)).label('popular_rank')
+            ).filter(FileRecord.is_deleted == False).subquery()
+            
+            ranked_files = self.db.query(
+                FileRecord, ranked.c.recent_rank, ranked.c.popular_rank
+            ).options(defer(FileRecord.content)).join(ranked, FileRecord.id == ranked.c.id).filter(
+                or_(ranked.c.recent_rank <= 5, ranked.c.popular_rank <= 5)
+            ).all()
             
-            return FileStatsResponse(
+            recent_uploads = [
+                FileResponse.model_validate(row.FileRecord)
+                for row in sorted(ranked_files, key=lambda row: row.recent_rank)
+                if row.recent_rank <= 5
+            ]
+            popular_files_list = [
+                FileResponse.model_validate(row.FileRecord)
+                for row in sorted(ranked_files, key=lambda row: row.popular_rank)
+                if row.popular_rank <= 5
+            ]
+            
+            stats = FileStatsResponse(
                 total_files=total_files,
                 total_size=total_size,
                 files_by_stage=files_by_stage,
@@ -457,11 +746,16 @@ class FileService:
                 popular_files=popular_files_list
             )
             
+            with _stats_cache_lock:
+                _stats_cache["stats"] = stats
+            
+            return stats
+            
         except Exception as e:
             logger.error(f"获取文件统计失败: {e}")
             raise
     
-    async def search_files(
+    def search_files(
         self,
         query: Optional[str] = None,
         stage: Optional[str] = None,
@@ -472,7 +766,8 @@ class FileService:
         page: int = 1,
         size: int = 20,
         sort_by: str = "created_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         搜索文件
@@ -488,21 +783,18 @@ class FileService:
             size: 每页数量
             sort_by: 排序字段
             sort_order: 排序方向
+            cursor: 分页游标（仅按created_at排序时支持，传入时忽略page）
             
         Returns:
-            Dict[str, Any]: 搜索结果
+            Dict[str, Any]: 搜索结果，按created_at排序时包含下一页游标next_cursor
         """
         try:
-            query_obj = self.db.query(FileRecord).filter(FileRecord.is_deleted == False)
+            # 搜索结果不返回提取的正文，跳过加载大字段content
+            query_obj = self.db.query(FileRecord).options(defer(FileRecord.content)).filter(FileRecord.is_deleted == False)
             
             # 关键词搜索
             if query:
-                search_filter = or_(
-                    FileRecord.original_name.ilike(f"%{query}%"),
-                    FileRecord.description.ilike(f"%{query}%"),
-                    FileRecord.content.ilike(f"%{query}%")
-                )
-                query_obj = query_obj.filter(search_filter)
+                query_obj = query_obj.filter(self._search_filter(query))
             
             # 阶段筛选
             if stage:
@@ -510,8 +802,7 @@ class FileService:
             
             # 标签筛选
             if tags:
-                for tag in tags:
-                    query_obj = query_obj.filter(FileRecord.tags.contains([tag]))
+                query_obj = self._apply_tags_filter(query_obj, tags)
             
             # 文件类型筛选
             if file_type:
@@ -523,25 +814,43 @@ class FileService:
             if date_to:
                 query_obj = query_obj.filter(FileRecord.created_at <= date_to)
             
-            # 排序
-            if sort_order.lower() == "desc":
-                query_obj = query_obj.order_by(desc(getattr(FileRecord, sort_by)))
+            # 排序（以ID为第二排序键，保证顺序稳定）
+            descending = sort_order.lower() == "desc"
+            sort_column = getattr(FileRecord, sort_by)
+            if descending:
+                query_obj = query_obj.order_by(desc(sort_column), desc(FileRecord.id))
             else:
-                query_obj = query_obj.order_by(getattr(FileRecord, sort_by))
-            
-            # 获取总数
-            total = query_obj.count()
-            
-            # 分页
-            offset = (page - 1) * size
-            files = query_obj.offset(offset).limit(size).all()
+                query_obj = query_obj.order_by(sort_column, FileRecord.id)
+            
+            # 分页：按created_at排序且有游标时走键集分页
+            keyset = sort_by == "created_at"
+            if cursor and keyset:
+                # 游标条件会缩小窗口计数的范围，总数需单独查询
+                total = query_obj.count()
+                files = query_obj.filter(self._keyset_filter(cursor, descending)).limit(size).all()
+            else:
+                # 总数随分页结果通过窗口函数一并返回，省去单独的count查询
+                rows = query_obj.add_columns(
+                    func.count().over().label('total_count')
+                ).offset((page - 1) * size).limit(size).all()
+                files = [row.FileRecord for row in rows]
+                if rows:
+                    total = rows[0].total_count
+                else:
+                    # 超出末页时窗口函数没有行可返回，回退为count查询
+                    total = query_obj.count() if page > 1 else 0
+            
+            next_cursor = None
+            if keyset and len(files) == size:
+                next_cursor = encode_cursor(files[-1].created_at, files[-1].id)
             
             return {
                 "files": [FileResponse.model_validate(file) for file in files],
                 "total": total,
                 "page": page,
                 "size": size,
-                "total_pages": (total + size - 1) // size
+                "total_pages": (total + size - 1) // size,
+                "next_cursor": next_cursor
             }
             
         except Exception as e:
@@ -559,20 +868,20 @@ class FileService:
             bool: 标记是否成功
         """
         try:
-            file_record = self.db.query(FileRecord).filter(
-                and_(
-                    FileRecord.id == file_id,
-                    FileRecord.is_deleted == False
-                )
-            ).first()
+            # 直接UPDATE，不先查询加载整行
+            result = self.db.execute(
+                update(FileRecord)
+                .where(and_(FileRecord.id == file_id, FileRecord.is_deleted == False))
+                .values(is_processed=True)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
             
-            if not file_record:
+            if result.rowcount == 0:
                 logger.warning(f"文件不存在或已删除: {file_id}")
                 return False
             
-            file_record.is_processed = True
-            self.db.commit()
-            
+            file_cache.invalidate(file_id)
             logger.info(f"文件已标记为已处理: {file_id}")
             return True
             
@@ -580,7 +889,38 @@ class FileService:
             logger.error(f"标记文件已处理失败: {e}")
             self.db.rollback()
             return False
-    
+
+    def mark_files_processed(self, file_ids: List[str]) -> int:
+        """
+        批量标记文件已处理，一条UPDATE、一次提交
+
+        Args:
+            file_ids: 文件ID列表
+
+        Returns:
+            int: 标记成功的文件数量
+        """
+        if not file_ids:
+            return 0
+
+        try:
+            result = self.db.execute(
+                update(FileRecord)
+                .where(and_(FileRecord.id.in_(file_ids), FileRecord.is_deleted == False))
+                .values(is_processed=True)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+
+            file_cache.invalidate(*file_ids)
+            logger.info(f"批量标记文件已处理: {result.rowcount} 个文件")
+            return result.rowcount
+
+        except Exception as e:
+            logger.error(f"批量标记文件已处理失败: {e}")
+            self.db.rollback()
+            return 0
+
     def get_files_by_project(self, project_id: str) -> List[FileRecord]:
         """
         获取项目的所有文件
@@ -592,7 +932,7 @@ class FileService:
             List[FileRecord]: 文件列表
         """
         try:
-            files = self.db.query(FileRecord).filter(
+            files = self.db.query(FileRecord).options(defer(FileRecord.content)).filter(
                 and_(
                     FileRecord.project_id == project_id,
                     FileRecord.is_deleted == False
@@ -613,7 +953,7 @@ class FileService:
             List[FileRecord]: 文件列表
         """
         try:
-            files = self.db.query(FileRecord).filter(
+            files = self.db.query(FileRecord).options(defer(FileRecord.content)).filter(
                 and_(
                     FileRecord.is_deleted == False,
                     FileRecord.is_processed == False
@@ -634,7 +974,7 @@ class FileService:
             List[FileRecord]: 文件列表
         """
         try:
-            files = self.db.query(FileRecord).filter(
+            files = self.db.query(FileRecord).options(defer(FileRecord.content)).filter(
                 FileRecord.is_deleted == False
             ).all()
             
@@ -1,25 +1,28 @@
 import asyncio
 import io
-from typing import Optional, AsyncIterator
+from typing import List, Optional, AsyncIterator
 from pathlib import Path
 import shutil
 import uuid
+import aiofiles
 from loguru import logger
 
 from fastapi import UploadFile, HTTPException
 
 from app.core.config import settings
 
+# 文件读写的分块大小（1MB）
+CHUNK_SIZE = 1024 * 1024
+
+# 统一使用backend目录下的uploads文件夹
+# file_storage.py在backend/app/services/下，所以向上3级到backend目录
+_STORAGE_PATH = Path(__file__).resolve().parent.parent.parent / "uploads"
+
 class LocalFileService:
     """本地文件存储服务"""
     
     def __init__(self):
-        # 统一使用backend目录下的uploads文件夹
-        # 从当前文件位置向上找到backend目录
-        current_file = Path(__file__).resolve()
-        # file_storage.py在backend/app/services/下，所以向上3级到backend目录
-        backend_dir = current_file.parent.parent.parent
-        self.storage_path = backend_dir / "uploads"
+        self.storage_path = _STORAGE_PATH
         self._ensure_storage_exists()
         logger.info("本地文件存储服务初始化成功")
     
@@ -51,10 +54,13 @@ class LocalFileService:
             # 确保父目录存在
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # 保存文件
-            content = await file.read()
-            with open(file_path, 'wb') as f:
-                f.write(content)
+            # 分块写入，避免把整个文件读入内存
+            async with aiofiles.open(file_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await f.write(chunk)
             
             logger.info(f"文件保存成功: {file_path}")
             return f"uploads/{object_name}"
@@ -83,9 +89,9 @@ class LocalFileService:
             if not file_path.exists():
                 raise HTTPException(status_code=404, detail="文件不存在")
             
-            with open(file_path, 'rb') as f:
+            async with aiofiles.open(file_path, 'rb') as f:
                 while True:
-                    chunk = f.read(8192)  # 8KB chunks
+                    chunk = await f.read(CHUNK_SIZE)
                     if not chunk:
                         break
                     yield chunk
@@ -109,32 +115,51 @@ class LocalFileService:
         Returns:
             bool: 删除是否成功
         """
-        try:
-            # 确保object_name是完整的路径
-            file_path = self.storage_path / object_name
-            
-            # 记录详细的删除信息用于调试
-            logger.info(f"尝试删除文件: {file_path.absolute()}")
-            logger.info(f"文件是否存在: {file_path.exists()}")
+        deleted = self._unlink(object_name)
+        if deleted:
+            logger.info(f"物理文件删除成功: {object_name}")
+        return deleted
+
+    async def delete_files(
+        self, 
+        object_names: List[str], 
+        bucket_name: Optional[str] = None
+    ) -> List[bool]:
+        """
+        批量删除文件（并发执行）
+        
+        Args:
+            object_names: 对象名称列表
+            bucket_name: 兼容参数（忽略）
             
-            if file_path.exists():
-                file_path.unlink()
-                logger.info(f"✅ 物理文件删除成功: {file_path.absolute()}")
-                
-                # 双重验证文件是否真的被删除
-                if not file_path.exists():
-                    logger.info(f"✅ 确认文件已被物理删除: {object_name}")
-                    return True
-                else:
-                    logger.error(f"❌ 文件删除后仍然存在: {file_path.absolute()}")
-                    return False
-            else:
-                logger.warning(f"⚠️ 文件不存在，无需删除: {file_path.absolute()}")
-                return True  # 文件不存在也算删除成功
-        except Exception as e:
-            logger.error(f"❌ 文件删除失败: {object_name}, 错误: {e}")
+        Returns:
+            List[bool]: 每个文件是否删除成功
+        """
+        return list(await asyncio.gather(*(
+            asyncio.to_thread(self._unlink, object_name) for object_name in object_names
+        )))
+
+    def _unlink(self, object_name: str) -> bool:
+        """删除单个文件，文件不存在也算删除成功"""
+        try:
+            (self.storage_path / object_name).unlink(missing_ok=True)
+            return True
+        except OSError as e:
+            logger.error(f"文件删除失败: {object_name}, 错误: {e}")
             return False
 
+    def get_file_path(self, object_name: str) -> Path:
+        """
+        获取文件在本地存储中的路径
+        
+        Args:
+            object_name: 对象名称
+            
+        Returns:
+            Path: 文件路径
+        """
+        return self.storage_path / object_name
+
     def get_file_url(
         self, 
         object_name: str, 
@@ -1,17 +1,46 @@
 import asyncio
 import io
-from typing import Optional, AsyncIterator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+from typing import Any, Callable, List, Optional, AsyncIterator
 from pathlib import Path
 import shutil
 import uuid
 
+import aiofiles
+import certifi
+import urllib3
+from cachetools import TLRUCache
 from minio import Minio
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 from fastapi import UploadFile, HTTPException
 from loguru import logger
 
 from app.core.config import settings
 
+# 分片上传的分片大小（minio要求不小于5MB）
+PART_SIZE = 10 * 1024 * 1024
+
+# 批量删除时每个请求包含的最大对象数（S3 DeleteObjects上限）
+DELETE_BATCH_SIZE = 1000
+
+# 下载时每次读取的块大小（1MB）
+CHUNK_SIZE = 1 << 20
+
+# minio-py为同步客户端，阻塞调用放到专用线程池中执行
+MAX_IO_WORKERS = 32
+
+# 首次使用时检查存储桶的重试次数及退避间隔（秒）
+BUCKET_CHECK_ATTEMPTS = 3
+BUCKET_CHECK_BACKOFF = 0.5
+
+def _url_ttu(key, value, now):
+    """预签名URL的缓存时长为其有效期的一半，保证返回的URL始终还有足够的剩余有效期"""
+    return now + key[2] / 2
+
 class MinIOService:
     """MinIO对象存储服务，支持降级到本地存储"""
     
@@ -19,32 +48,85 @@ class MinIOService:
         self.bucket_name = settings.MINIO_BUCKET_NAME
         self.fallback_mode = False
         self.local_storage_path = Path("uploads")
+        # 专用线程池，避免占满事件循环的默认线程池
+        self._executor = ThreadPoolExecutor(max_workers=MAX_IO_WORKERS, thread_name_prefix="minio")
+        # 预签名URL缓存，键为（存储桶, 对象名, 有效期秒数）
+        self._url_cache = TLRUCache(maxsize=10_000, ttu=_url_ttu)
+        self._url_cache_lock = threading.Lock()
+        
+        # 存储桶检查推迟到首次使用时进行，避免构造时阻塞在网络请求上
+        self._bucket_ready = False
+        self._init_lock = asyncio.Lock()
         
         try:
             self.client = Minio(
                 endpoint=settings.MINIO_ENDPOINT,
                 access_key=settings.MINIO_ACCESS_KEY,
                 secret_key=settings.MINIO_SECRET_KEY,
-                secure=settings.MINIO_SECURE
+                secure=settings.MINIO_SECURE,
+                http_client=self._create_http_client()
             )
-            self._ensure_bucket_exists()
-            logger.info("MinIO服务连接成功")
         except Exception as e:
             logger.warning(f"MinIO服务不可用，降级到本地文件存储: {e}")
             self.fallback_mode = True
             self._ensure_local_storage()
     
+    @staticmethod
+    def _create_http_client() -> urllib3.PoolManager:
+        """
+        创建HTTP连接池
+        
+        minio-py默认连接池只保留10个连接，并发超过时会反复新建连接；
+        这里与线程池大小保持一致，使每个工作线程都能复用长连接
+        """
+        return urllib3.PoolManager(
+            num_pools=10,
+            maxsize=MAX_IO_WORKERS,
+            block=False,
+            timeout=urllib3.Timeout(connect=5, read=300),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=certifi.where(),
+            retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        )
+    
     def _ensure_bucket_exists(self):
-        """确保存储桶存在"""
+        """确保存储桶存在（同步，在线程池中执行）"""
+        if self.client.bucket_exists(self.bucket_name):
+            return
         try:
-            if not self.client.bucket_exists(self.bucket_name):
-                self.client.make_bucket(self.bucket_name)
-                logger.info(f"创建MinIO存储桶: {self.bucket_name}")
+            self.client.make_bucket(self.bucket_name)
+            logger.info(f"创建MinIO存储桶: {self.bucket_name}")
         except S3Error as e:
-            logger.error(f"创建MinIO存储桶失败: {e}")
+            # 其他进程可能已同时创建
+            if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                raise
+    
+    async def _ensure_bucket_async(self):
+        """首次使用时检查存储桶，失败重试，仍失败则降级到本地存储"""
+        if self._bucket_ready or self.fallback_mode:
+            return
+        async with self._init_lock:
+            if self._bucket_ready or self.fallback_mode:
+                return
+            for attempt in range(1, BUCKET_CHECK_ATTEMPTS + 1):
+                try:
+                    await self._run(self._ensure_bucket_exists)
+                    self._bucket_ready = True
+                    logger.info("MinIO服务连接成功")
+                    return
+                except Exception as e:
+                    logger.warning(f"MinIO存储桶检查失败（第{attempt}次）: {e}")
+                    if attempt < BUCKET_CHECK_ATTEMPTS:
+                        await asyncio.sleep(BUCKET_CHECK_BACKOFF * attempt)
+            logger.warning("MinIO服务不可用，降级到本地文件存储")
             self.fallback_mode = True
             self._ensure_local_storage()
     
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行阻塞的minio-py调用"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
     def _ensure_local_storage(self):
         """确保本地存储目录存在"""
         self.local_storage_path.mkdir(exist_ok=True)
@@ -67,6 +149,7 @@ class MinIOService:
         Returns:
             str: 文件存储路径
         """
+        await self._ensure_bucket_async()
         if self.fallback_mode:
             return await self._upload_to_local(file, object_name)
         else:
@@ -80,10 +163,11 @@ class MinIOService:
             # 确保父目录存在
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # 保存文件
-            content = await file.read()
-            with open(file_path, 'wb') as f:
-                f.write(content)
+            # 分块保存文件（MinIO上传失败降级时文件指针可能已移动）
+            await file.seek(0)
+            async with aiofiles.open(file_path, 'wb') as f:
+                while chunk := await file.read(CHUNK_SIZE):
+                    await f.write(chunk)
             
             logger.info(f"文件保存到本地: {file_path}")
             return str(file_path)
@@ -104,14 +188,16 @@ class MinIOService:
             
             # 重置文件指针
             await file.seek(0)
-            content = await file.read()
             
-            # 上传到MinIO
-            self.client.put_object(
+            # 直接从上传的临时文件流式上传，不把整个文件读入内存；
+            # 已知大小时小文件可一次PUT完成，未知时按分片上传
+            await self._run(
+                self.client.put_object,
                 bucket_name=bucket,
                 object_name=object_name,
-                data=io.BytesIO(content),
-                length=len(content),
+                data=file.file,
+                length=file.size if file.size is not None else -1,
+                part_size=PART_SIZE,
                 content_type=file.content_type
             )
             
@@ -143,6 +229,7 @@ class MinIOService:
         Yields:
             bytes: 文件内容
         """
+        await self._ensure_bucket_async()
         if self.fallback_mode:
             async for chunk in self._download_from_local(object_name):
                 yield chunk
@@ -157,11 +244,8 @@ class MinIOService:
             if not file_path.exists():
                 raise HTTPException(status_code=404, detail="文件不存在")
             
-            with open(file_path, 'rb') as f:
-                while True:
-                    chunk = f.read(8192)  # 8KB chunks
-                    if not chunk:
-                        break
+            async with aiofiles.open(file_path, 'rb') as f:
+                while chunk := await f.read(CHUNK_SIZE):
                     yield chunk
                     
         except Exception as e:
@@ -177,12 +261,14 @@ class MinIOService:
         try:
             bucket = bucket_name or self.bucket_name
             
-            response = self.client.get_object(bucket, object_name)
+            response = await self._run(self.client.get_object, bucket, object_name)
             
             try:
+                # 使用urllib3响应自带的分块迭代器，每次在线程池中取下一块
+                chunks = response.stream(CHUNK_SIZE)
                 while True:
-                    chunk = response.read(8192)  # 8KB chunks
-                    if not chunk:
+                    chunk = await self._run(next, chunks, None)
+                    if chunk is None:
                         break
                     yield chunk
             finally:
@@ -211,6 +297,7 @@ class MinIOService:
         Returns:
             bool: 删除是否成功
         """
+        await self._ensure_bucket_async()
         if self.fallback_mode:
             return await self._delete_from_local(object_name)
         else:
@@ -220,11 +307,12 @@ class MinIOService:
         """从本地存储删除文件"""
         try:
             file_path = self.local_storage_path / object_name
-            if file_path.exists():
-                file_path.unlink()
-                logger.info(f"本地文件删除成功: {file_path}")
-                return True
-            return False
+            try:
+                await asyncio.to_thread(file_path.unlink)
+            except FileNotFoundError:
+                return False
+            logger.info(f"本地文件删除成功: {file_path}")
+            return True
         except Exception as e:
             logger.error(f"本地文件删除失败: {e}")
             return False
@@ -237,7 +325,7 @@ class MinIOService:
         """从MinIO删除文件"""
         try:
             bucket = bucket_name or self.bucket_name
-            self.client.remove_object(bucket, object_name)
+            await self._run(self.client.remove_object, bucket, object_name)
             logger.info(f"MinIO文件删除成功: {object_name}")
             return True
         except S3Error as e:
@@ -247,6 +335,47 @@ class MinIOService:
             logger.error(f"文件删除失败: {e}")
             return False
 
+    async def delete_files(
+        self, 
+        object_names: List[str], 
+        bucket_name: Optional[str] = None
+    ) -> List[str]:
+        """
+        批量删除文件
+        
+        MinIO下使用DeleteObjects接口，每1000个对象一次请求
+        
+        Args:
+            object_names: 对象名称列表
+            bucket_name: 存储桶名称
+            
+        Returns:
+            List[str]: 删除失败的对象名称
+        """
+        await self._ensure_bucket_async()
+        if self.fallback_mode:
+            results = await asyncio.gather(*(self._delete_from_local(name) for name in object_names))
+            return [name for name, deleted in zip(object_names, results) if not deleted]
+        
+        bucket = bucket_name or self.bucket_name
+        failed: List[str] = []
+        for start in range(0, len(object_names), DELETE_BATCH_SIZE):
+            batch = object_names[start:start + DELETE_BATCH_SIZE]
+            try:
+                # remove_objects是惰性迭代器，需在线程中完整消费才会真正发出请求
+                errors = await self._run(
+                    lambda: list(self.client.remove_objects(bucket, [DeleteObject(name) for name in batch]))
+                )
+                for error in errors:
+                    logger.error(f"MinIO文件删除失败: {error.name}, {error.message}")
+                    failed.append(error.name)
+            except Exception as e:
+                logger.error(f"MinIO批量删除失败: {e}")
+                failed.extend(batch)
+        
+        logger.info(f"MinIO批量删除完成: {len(object_names) - len(failed)}/{len(object_names)}")
+        return failed
+
     def get_file_url(
         self, 
         object_name: str, 
@@ -270,7 +399,14 @@ class MinIOService:
         else:
             try:
                 bucket = bucket_name or self.bucket_name
-                return self.client.presigned_get_object(bucket, object_name, expires=expires)
+                key = (bucket, object_name, expires)
+                with self._url_cache_lock:
+                    url = self._url_cache.get(key)
+                if url is None:
+                    url = self.client.presigned_get_object(bucket, object_name, expires=timedelta(seconds=expires))
+                    with self._url_cache_lock:
+                        self._url_cache[key] = url
+                return url
             except Exception as e:
                 logger.error(f"获取文件URL失败: {e}")
                 return f"/uploads/{object_name}"  # 降级到本地路径
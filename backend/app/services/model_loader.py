@@ -4,6 +4,7 @@ AI模型加载器
 """
 
 import os
+from collections import OrderedDict
 # 移除不必要的torch导入 - 云端API模式不需要
 from typing import Optional, Dict, Any, List
 from pathlib import Path
@@ -12,11 +13,17 @@ import numpy as np
 
 from ..core.model_config import model_manager, EmbeddingModelConfig, LLMModelConfig, MultimodalModelConfig
 
+# 模拟嵌入向量使用的随机数生成器，直接生成float32，免去float64到float32的转换
+_RNG = np.random.default_rng()
+
+# 同时保留的模型实例上限，超出时按最近最少使用淘汰
+MAX_LOADED_MODELS = 8
+
 class ModelLoader:
     """云端AI模型加载器"""
     
     def __init__(self):
-        self.models = {}
+        self.models: "OrderedDict[str, Any]" = OrderedDict()
         self.model_cache_dir = Path("../models")  # 使用项目根目录
         self.model_cache_dir.mkdir(exist_ok=True)
         
@@ -27,6 +34,14 @@ class ModelLoader:
         """设置云端API服务"""
         logger.info("使用云端AI服务，无需本地模型加载")
     
+    def _cache_model(self, cache_key: str, model: Any) -> None:
+        """缓存模型实例，超出上限时淘汰最久未使用的模型"""
+        self.models[cache_key] = model
+        self.models.move_to_end(cache_key)
+        while len(self.models) > MAX_LOADED_MODELS:
+            evicted_key, _ = self.models.popitem(last=False)
+            logger.info(f"模型已卸载: {evicted_key}")
+    
     def load_embedding_model(self, model_name: Optional[str] = None) -> Any:
         """加载嵌入模型 - 云端API模式"""
         try:
@@ -44,12 +59,10 @@ class ModelLoader:
                 def encode(self, texts: List[str]) -> np.ndarray:
                     """模拟嵌入编码 - 实际应调用云端API"""
                     # 这里应该调用真实的云端API，目前返回模拟向量
-                    batch_size = len(texts)
-                    embedding_dim = self.config.embedding_size
-                    return np.random.random((batch_size, embedding_dim)).astype(np.float32)
+                    return _RNG.standard_normal((len(texts), self.config.embedding_size), dtype=np.float32)
             
             model = CloudEmbeddingModel(config)
-            self.models[f"embedding_{model_name}"] = model
+            self._cache_model(f"embedding_{model_name}", model)
             logger.info(f"云端嵌入模型准备就绪: {config.model_name}")
             return model
             
@@ -81,7 +94,7 @@ class ModelLoader:
                     return f"[云端AI回复] 针对您的问题: {last_message[:50]}..."
             
             model = CloudLLMModel(config)
-            self.models[f"llm_{model_name}"] = model
+            self._cache_model(f"llm_{model_name}", model)
             logger.info(f"云端LLM模型准备就绪: {config.model_name}")
             return model
             
@@ -112,7 +125,7 @@ class ModelLoader:
                     return "[云端AI处理] 多模态内容分析完成"
             
             model = CloudMultimodalModel(config)
-            self.models[f"multimodal_{model_name}"] = model
+            self._cache_model(f"multimodal_{model_name}", model)
             logger.info(f"云端多模态模型准备就绪: {config.model_name}")
             return model
             
@@ -125,6 +138,7 @@ class ModelLoader:
         cache_key = f"{model_type}_{model_name}"
         
         if cache_key in self.models:
+            self.models.move_to_end(cache_key)
             return self.models[cache_key]
         
         # 根据类型加载模型
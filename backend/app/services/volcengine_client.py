@@ -4,27 +4,80 @@
 """
 
 import os
-import json
+import asyncio
+import hashlib
+import threading
+import httpx
+import orjson
 import requests
-from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
 import numpy as np
+from cachetools import LRUCache
 from pathlib import Path
 
-# 加载环境变量
-try:
-    from dotenv import load_dotenv
-    # 从backend目录向上查找.env文件
-    env_path = Path(__file__).parent.parent.parent.parent / ".env"
-    if env_path.exists():
-        load_dotenv(env_path)
-        logger.info(f"已加载环境变量文件: {env_path}")
-    else:
-        logger.warning(f"未找到环境变量文件: {env_path}")
-except ImportError:
-    logger.warning("未安装 python-dotenv")
-except Exception as e:
-    logger.error(f"加载环境变量失败: {e}")
+# 本模块从进程环境读取的配置项
+ENV_KEYS = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "DEFAULT_LLM_MODEL", "DEFAULT_EMBEDDING_MODEL")
+
+# 加载环境变量：上述配置项已全部由进程环境提供时（如容器部署）跳过.env文件的查找和解析；
+# 只提供了部分配置项时仍加载.env补齐其余项，override=False不会覆盖进程环境中已有的值
+if not all(os.getenv(key) for key in ENV_KEYS):
+    try:
+        from dotenv import load_dotenv
+        # 从backend目录向上查找.env文件
+        env_path = Path(__file__).parent.parent.parent.parent / ".env"
+        if env_path.exists():
+            load_dotenv(env_path, override=False)
+            logger.info(f"已加载环境变量文件: {env_path}")
+        else:
+            logger.warning(f"未找到环境变量文件: {env_path}")
+    except ImportError:
+        logger.warning("未安装 python-dotenv")
+    except Exception as e:
+        logger.error(f"加载环境变量失败: {e}")
+
+# 每次嵌入请求包含的最大文本数
+EMBEDDING_BATCH_SIZE = 64
+
+# 火山引擎嵌入向量维度
+EMBEDDING_DIM = 2560
+
+# HTTP连接池大小
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 64
+
+# 异步嵌入请求的默认并发数
+EMBEDDING_CONCURRENCY = 16
+
+# 流式响应每次读取的字节数
+STREAM_CHUNK_SIZE = 4096
+
+# 嵌入向量缓存的最大条目数
+EMBEDDING_CACHE_SIZE = 50_000
+
+def _to_vector(values: List[float]) -> np.ndarray:
+    """转换为只读的float32向量，缓存中的向量会被多个调用方共享"""
+    vector = np.asarray(values, dtype=np.float32)
+    vector.setflags(write=False)
+    return vector
+
+
+def _zero_embedding() -> np.ndarray:
+    """请求失败时使用的零向量"""
+    return np.zeros(EMBEDDING_DIM, dtype=np.float32)
+
+
+async def _stream_words(text: str, stream_delay: float = 0.0):
+    """按词输出模拟的流式回复，stream_delay大于0时在词之间等待"""
+    words = text.split()
+    tokens = words[:1] + [f" {word}" for word in words[1:]]
+    for token in tokens:
+        yield token
+        if stream_delay > 0:
+            await asyncio.sleep(stream_delay)
+
 
 class VolcengineClient:
     """火山引擎API客户端"""
@@ -41,6 +94,34 @@ class VolcengineClient:
             # 不抛出异常，允许应用继续运行
             self.api_key = "dummy_key"
         
+        # 预先拼好接口地址
+        self._chat_url = f"{self.base_url}chat/completions"
+        self._embeddings_url = f"{self.base_url}embeddings"
+        self._models_url = f"{self.base_url}models"
+        self._headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        # 复用同一个会话，保持长连接，避免每次请求重新建立TCP/TLS连接；
+        # 仅对连接失败重试，POST请求不按状态码重试，以免重复计费
+        self._session = requests.Session()
+        self._session.headers.update(self._headers)
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=Retry(total=3, connect=3, read=0, backoff_factor=0.3)
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        
+        # 异步客户端在首次使用时创建，绑定到当时的事件循环
+        self._aclient: Optional[httpx.AsyncClient] = None
+        
+        # 嵌入向量缓存，键为(模型名, 文本摘要)，只缓存请求成功的结果
+        self._embedding_cache: LRUCache = LRUCache(maxsize=EMBEDDING_CACHE_SIZE)
+        self._embedding_cache_lock = threading.Lock()
+        
         logger.info(f"火山引擎客户端初始化成功")
         logger.info(f"  API地址: {self.base_url}")
         logger.info(f"  LLM模型: {self.llm_model}")
@@ -52,8 +133,6 @@ class VolcengineClient:
             if self.api_key == "dummy_key":
                 return "抱歉，火山引擎API密钥未配置，无法生成文本。"
             
-            url = f"{self.base_url}chat/completions"
-            
             data = {
                 "model": self.llm_model,
                 "messages": [
@@ -64,50 +143,175 @@ class VolcengineClient:
                 "stream": False
             }
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = self._session.post(self._chat_url, data=orjson.dumps(data), timeout=30)
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             return result["choices"][0]["message"]["content"]
             
         except Exception as e:
             logger.error(f"文本生成失败: {e}")
             return f"抱歉，生成失败: {str(e)}"
     
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str) -> np.ndarray:
         """获取文本嵌入向量"""
+        return self.get_embeddings([text])[0]
+    
+    def _cache_key(self, text: str) -> Tuple[str, bytes]:
+        """嵌入缓存键：模型名 + 文本摘要"""
+        return self.embedding_model, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    
+    def _split_cached(self, texts: List[str]) -> Tuple[List[Optional[np.ndarray]], List[Tuple[Tuple[str, bytes], List[int]]]]:
+        """
+        从缓存中取出已有的嵌入向量
+        
+        Returns:
+            结果列表（未命中的位置为None），以及未命中的(缓存键, 位置列表)，相同文本只请求一次
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        pending: Dict[Tuple[str, bytes], List[int]] = {}
+        with self._embedding_cache_lock:
+            for i, text in enumerate(texts):
+                key = self._cache_key(text)
+                cached = self._embedding_cache.get(key)
+                if cached is not None:
+                    results[i] = cached
+                else:
+                    pending.setdefault(key, []).append(i)
+        return results, list(pending.items())
+    
+    def _fill_results(self, results: List[Optional[np.ndarray]], batch: List[Tuple[Tuple[str, bytes], List[int]]],
+                      vectors: Optional[List[np.ndarray]]) -> None:
+        """将一批请求结果写入结果列表；只缓存成功的结果，失败时填充零向量"""
+        if vectors is None:
+            for _, positions in batch:
+                for i in positions:
+                    results[i] = _zero_embedding()
+            return
+        
+        with self._embedding_cache_lock:
+            for (key, positions), vector in zip(batch, vectors):
+                self._embedding_cache[key] = vector
+                for i in positions:
+                    results[i] = vector
+    
+    def cache_clear(self) -> None:
+        """清空嵌入向量缓存"""
+        with self._embedding_cache_lock:
+            self._embedding_cache.clear()
+    
+    def _embed_batch(self, batch: List[str]) -> Optional[List[np.ndarray]]:
+        """请求一批文本的嵌入向量，失败时返回None"""
         try:
-            if self.api_key == "dummy_key":
-                # 返回零向量作为备用
-                return [0.0] * 2560  # 火山引擎嵌入向量维度
-            
-            url = f"{self.base_url}embeddings"
-            
             data = {
                 "model": self.embedding_model,
-                "input": text
+                "input": batch
             }
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
+            response = self._session.post(self._embeddings_url, data=orjson.dumps(data), timeout=30)
+            response.raise_for_status()
+            
+            result = orjson.loads(response.content)
+            # 按index还原输入顺序
+            items = sorted(result["data"], key=lambda item: item.get("index", 0))
+            return [_to_vector(item["embedding"]) for item in items]
+            
+        except Exception as e:
+            logger.error(f"获取嵌入向量失败: {e}")
+            return None
+    
+    def get_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        批量获取文本嵌入向量
+        
+        先查缓存，未命中的文本每EMBEDDING_BATCH_SIZE条合并为一次请求，某批失败时该批返回零向量
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            List[np.ndarray]: 与输入顺序一致的float32嵌入向量列表
+        """
+        if self.api_key == "dummy_key":
+            # 返回零向量作为备用
+            return [_zero_embedding() for _ in texts]
+        
+        results, pending = self._split_cached(texts)
+        for start in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+            batch = pending[start:start + EMBEDDING_BATCH_SIZE]
+            vectors = self._embed_batch([texts[positions[0]] for _, positions in batch])
+            self._fill_results(results, batch, vectors)
+        
+        return results
+    
+    def _get_aclient(self) -> httpx.AsyncClient:
+        """获取共享的异步HTTP客户端"""
+        if self._aclient is None or self._aclient.is_closed:
+            self._aclient = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=30,
+                limits=httpx.Limits(max_connections=POOL_MAXSIZE)
+            )
+        return self._aclient
+    
+    async def aclose(self) -> None:
+        """关闭异步HTTP客户端"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+    
+    async def _aembed_batch(self, batch: List[str]) -> Optional[List[np.ndarray]]:
+        """异步请求一批文本的嵌入向量，失败时返回None"""
+        try:
+            data = {
+                "model": self.embedding_model,
+                "input": batch
             }
             
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = await self._get_aclient().post(self._embeddings_url, content=orjson.dumps(data))
             response.raise_for_status()
             
-            result = response.json()
-            return result["data"][0]["embedding"]
+            result = orjson.loads(response.content)
+            items = sorted(result["data"], key=lambda item: item.get("index", 0))
+            return [_to_vector(item["embedding"]) for item in items]
             
         except Exception as e:
             logger.error(f"获取嵌入向量失败: {e}")
-            # 返回零向量作为备用
-            return [0.0] * 2560  # 火山引擎嵌入向量维度
+            return None
+    
+    async def aget_embedding(self, text: str) -> np.ndarray:
+        """异步获取文本嵌入向量"""
+        return (await self.aembed_many([text]))[0]
+    
+    async def aembed_many(self, texts: List[str], concurrency: int = EMBEDDING_CONCURRENCY) -> List[np.ndarray]:
+        """
+        异步批量获取文本嵌入向量
+        
+        先查缓存，未命中的文本按EMBEDDING_BATCH_SIZE分批后并发请求，同时进行的请求数不超过concurrency
+        
+        Args:
+            texts: 文本列表
+            concurrency: 最大并发请求数
+            
+        Returns:
+            List[np.ndarray]: 与输入顺序一致的float32嵌入向量列表
+        """
+        if self.api_key == "dummy_key":
+            return [_zero_embedding() for _ in texts]
+        
+        results, pending = self._split_cached(texts)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(batch: List[Tuple[Tuple[str, bytes], List[int]]]) -> None:
+            async with semaphore:
+                vectors = await self._aembed_batch([texts[positions[0]] for _, positions in batch])
+            self._fill_results(results, batch, vectors)
+        
+        await asyncio.gather(*(
+            run(pending[start:start + EMBEDDING_BATCH_SIZE])
+            for start in range(0, len(pending), EMBEDDING_BATCH_SIZE)
+        ))
+        return results
     
     def chat_completion(self, messages: List[Dict[str, str]], **kwargs) -> str:
         """聊天完成"""
@@ -115,8 +319,6 @@ class VolcengineClient:
             if self.api_key == "dummy_key":
                 return "抱歉，火山引擎API密钥未配置，无法进行聊天。"
             
-            url = f"{self.base_url}chat/completions"
-            
             data = {
                 "model": self.llm_model,
                 "messages": messages,
@@ -125,40 +327,33 @@ class VolcengineClient:
                 "stream": False
             }
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(url, json=data, headers=headers, timeout=30)
+            response = self._session.post(self._chat_url, data=orjson.dumps(data), timeout=30)
             response.raise_for_status()
             
-            result = response.json()
+            result = orjson.loads(response.content)
             return result["choices"][0]["message"]["content"]
             
         except Exception as e:
             logger.error(f"聊天完成失败: {e}")
             return f"抱歉，聊天失败: {str(e)}"
 
-    async def chat_completion_stream(self, messages: List[Dict[str, str]], **kwargs):
-        """流式聊天完成"""
+    async def chat_completion_stream(self, messages: List[Dict[str, str]], stream_delay: float = 0.0, **kwargs):
+        """
+        流式聊天完成
+        
+        Args:
+            messages: 对话消息列表
+            stream_delay: 模拟/降级输出时每个词之间的间隔秒数，默认不等待
+        """
         try:
             if self.api_key == "dummy_key":
                 # 模拟流式输出，用于演示
                 fallback_text = "抱歉，火山引擎API密钥未配置。这是一个模拟的流式回复示例，展示逐字显示效果。您可以配置真实的API密钥来获得完整功能。"
-                import asyncio
-                words = fallback_text.split()
-                for i, word in enumerate(words):
-                    if i == 0:
-                        yield word
-                    else:
-                        yield f" {word}"
-                    await asyncio.sleep(0.1)  # 控制流式速度
+                async for token in _stream_words(fallback_text, stream_delay):
+                    yield token
                 return
             
             # 真实的流式API调用
-            url = f"{self.base_url}chat/completions"
-            
             data = {
                 "model": self.llm_model,
                 "messages": messages,
@@ -167,46 +362,41 @@ class VolcengineClient:
                 "stream": True  # 启用流式输出
             }
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            import httpx
-            import asyncio
-            
-            async with httpx.AsyncClient() as client:
-                async with client.stream("POST", url, json=data, headers=headers, timeout=30) as response:
-                    response.raise_for_status()
-                    
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data_str = line[6:]  # 去掉 "data: " 前缀
-                            
-                            if data_str == "[DONE]":
-                                break
-                                
-                            try:
-                                chunk_data = json.loads(data_str)
-                                if "choices" in chunk_data and chunk_data["choices"]:
-                                    delta = chunk_data["choices"][0].get("delta", {})
-                                    if "content" in delta:
-                                        yield delta["content"]
-                            except json.JSONDecodeError:
-                                continue
+            async with self._get_aclient().stream("POST", self._chat_url, content=orjson.dumps(data)) as response:
+                response.raise_for_status()
+                
+                # 按字节缓冲拆分SSE行，只对data负载做JSON解析
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    buffer += chunk
+                    start = 0
+                    while (end := buffer.find(b"\n", start)) != -1:
+                        line = buffer[start:end].rstrip(b"\r")
+                        start = end + 1
+                        
+                        if not line.startswith(b"data: "):
+                            continue
+                        payload = bytes(line[6:])  # 去掉 "data: " 前缀
+                        
+                        if payload == b"[DONE]":
+                            return
+                        
+                        try:
+                            chunk_data = orjson.loads(payload)
+                            if "choices" in chunk_data and chunk_data["choices"]:
+                                delta = chunk_data["choices"][0].get("delta", {})
+                                if "content" in delta:
+                                    yield delta["content"]
+                        except orjson.JSONDecodeError:
+                            continue
+                    del buffer[:start]
                                 
         except Exception as e:
             logger.error(f"流式聊天完成失败: {e}")
             # 降级到模拟流式输出
             fallback_text = f"API调用失败，以下是降级回复：针对您的问题，建议从以下几个方面考虑解决方案..."
-            import asyncio
-            words = fallback_text.split()
-            for i, word in enumerate(words):
-                if i == 0:
-                    yield word
-                else:
-                    yield f" {word}"
-                await asyncio.sleep(0.1)
+            async for token in _stream_words(fallback_text, stream_delay):
+                yield token
     
     def test_connection(self) -> bool:
         """测试连接"""
@@ -215,11 +405,19 @@ class VolcengineClient:
                 logger.warning("火山引擎API密钥未配置，无法测试连接")
                 return False
             
-            # 简单的测试请求
-            test_prompt = "你好"
-            result = self.generate_text(test_prompt, max_tokens=10)
-            logger.info(f"火山引擎连接测试成功: {result}")
-            return True
+            # 查询模型列表，不产生推理计费
+            response = self._session.get(self._models_url, timeout=5)
+            if response.status_code in (404, 405):
+                # 不支持模型列表接口时，改用单条嵌入请求检测
+                connected = self._embed_batch(["ping"]) is not None
+            else:
+                connected = response.status_code == 200
+            
+            if connected:
+                logger.info("火山引擎连接测试成功")
+            else:
+                logger.error(f"火山引擎连接测试失败: HTTP {response.status_code}")
+            return connected
         except Exception as e:
             logger.error(f"火山引擎连接测试失败: {e}")
             return False
@@ -1,7 +1,12 @@
 import io
+import re
+import hashlib
 import mimetypes
-from typing import Optional, List
+import threading
+from importlib.util import find_spec
+from typing import Optional, List, Union, BinaryIO
 from pathlib import Path
+from cachetools import LRUCache
 from loguru import logger
 
 try:
@@ -11,38 +16,41 @@ except ImportError:
     HAS_MAGIC = False
     logger.warning("python-magic未安装或libmagic库缺失，无法根据内容检测文件类型")
 
-# 文件内容提取相关导入
+def _has_modules(*names: str) -> bool:
+    """检查模块是否已安装（只查找模块，不执行导入）"""
+    return all(find_spec(name) is not None for name in names)
+
+# xxh3为非加密哈希，只用于缓存键等内部标识，未安装时回退到blake2b
 try:
-    import pypdf
-    import pdfplumber
-    HAS_PDF = True
+    import xxhash
+    HAS_XXHASH = True
 except ImportError:
-    HAS_PDF = False
+    HAS_XXHASH = False
+
+# 文件内容提取相关依赖较重（pandas、pdfminer等），只在此检查是否安装，
+# 实际导入推迟到首次提取对应类型的文件时，加快应用启动
+HAS_PDF = _has_modules("pypdf", "pdfplumber")
+if not HAS_PDF:
     logger.warning("PDF处理库未安装，无法提取PDF内容")
 
-try:
-    from docx import Document
-    HAS_DOCX = True
-except ImportError:
-    HAS_DOCX = False
+HAS_DOCX = _has_modules("docx")
+if not HAS_DOCX:
     logger.warning("python-docx未安装，无法提取Word文档内容")
 
-try:
-    import openpyxl
-    import pandas as pd
-    HAS_EXCEL = True
-except ImportError:
-    HAS_EXCEL = False
+HAS_EXCEL = _has_modules("openpyxl", "pandas")
+if not HAS_EXCEL:
     logger.warning("Excel处理库未安装，无法提取Excel内容")
 
-try:
-    from PIL import Image
-    import pytesseract
-    HAS_OCR = True
-except ImportError:
-    HAS_OCR = False
+HAS_OCR = _has_modules("PIL", "pytesseract")
+if not HAS_OCR:
     logger.warning("OCR库未安装，无法进行图片文字识别")
 
+# OpenCV用于OCR前的图片去噪
+HAS_CV2 = _has_modules("cv2", "numpy")
+
+# tesserocr在进程内常驻识别引擎，可用时优先使用（pytesseract每次调用都要启动tesseract进程并重新加载语言模型）
+HAS_TESSEROCR = _has_modules("tesserocr")
+
 # 支持的文件类型
 SUPPORTED_FILE_TYPES = {
     # 文档类型
@@ -103,11 +111,62 @@ SUPPORTED_FILE_TYPES = {
     'text/x-less': ['.less'],
 }
 
+# OCR识别语言
+OCR_LANG = 'chi_sim+eng'
+
+# OCR页面分割模式（11：稀疏文本，尽可能找出所有文字）
+OCR_PSM = 11
+
+# OCR预处理：放大到的目标DPI、放大后的最长边上限、四周留白宽度（像素）
+OCR_TARGET_DPI = 300
+OCR_MAX_SIDE = 4000
+OCR_BORDER = 10
+
+# OCR结果缓存，键为(图片内容指纹, 识别语言)，重复上传的图片无需再次识别
+OCR_CACHE_SIZE = 1024
+_ocr_cache: LRUCache = LRUCache(maxsize=OCR_CACHE_SIZE)
+_ocr_cache_lock = threading.Lock()
+
+# 每个进程一个tesserocr引擎，首次识别时创建，调用需串行
+_tess_api = None
+_tess_lock = threading.Lock()
+
+# 扩展名 -> MIME类型，以及全部支持的扩展名，模块加载时一次性展开
+_EXT_TO_MIME = {ext: mime_type for mime_type, exts in SUPPORTED_FILE_TYPES.items() for ext in exts}
+_SUPPORTED_EXTS = frozenset(_EXT_TO_MIME)
+
+# 文件分类：完整MIME类型精确匹配，其次按主类型匹配，最后按关键字识别压缩包
+_EXACT_CATEGORY = {
+    'application/pdf': 'document',
+    'application/msword': 'document',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'document',
+    'application/vnd.ms-excel': 'spreadsheet',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'spreadsheet',
+}
+_PREFIX_CATEGORY = {
+    'image': 'image',
+    'video': 'video',
+    'audio': 'audio',
+    'text': 'text',
+}
+_ARCHIVE_KEYWORDS = ('zip', 'rar', 'tar')
+
+# 文件名中的危险字符与连续的点
+_FILENAME_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+_REPEATED_DOTS_RE = re.compile(r'\.{2,}')
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*]|\.\.')
+
+# 按内容识别类型时读取的文件头长度，libmagic的签名检测只需要开头几KB
+MAGIC_PREFIX_SIZE = 4096
+
 # 文件大小限制（字节）
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 MAX_IMAGE_SIZE = 10 * 1024 * 1024   # 10MB
 MAX_VIDEO_SIZE = 500 * 1024 * 1024  # 500MB
 
+# 文件大小单位
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
 def get_file_type(filename: str) -> Optional[str]:
     """
     根据文件名获取MIME类型
@@ -119,15 +178,17 @@ def get_file_type(filename: str) -> Optional[str]:
         Optional[str]: MIME类型
     """
     try:
-        mime_type, _ = mimetypes.guess_type(filename)
+        mime_type = _EXT_TO_MIME.get(Path(filename).suffix.lower())
+        if mime_type is None:
+            mime_type, _ = mimetypes.guess_type(filename)
         return mime_type
     except Exception as e:
         logger.error(f"获取文件类型失败: {e}")
         return None
 
-def get_file_type_by_content(file_content: bytes) -> Optional[str]:
+def get_file_type_by_content(file_content: Union[bytes, memoryview]) -> Optional[str]:
     """
-    根据文件内容获取MIME类型
+    根据文件内容获取MIME类型（只取开头MAGIC_PREFIX_SIZE字节交给libmagic）
     
     Args:
         file_content: 文件内容
@@ -139,12 +200,30 @@ def get_file_type_by_content(file_content: bytes) -> Optional[str]:
         return None
         
     try:
-        mime_type = magic.from_buffer(file_content, mime=True)
+        mime_type = magic.from_buffer(bytes(file_content[:MAGIC_PREFIX_SIZE]), mime=True)
         return mime_type
     except Exception as e:
         logger.error(f"根据内容获取文件类型失败: {e}")
         return None
 
+def get_file_type_by_stream(stream: BinaryIO) -> Optional[str]:
+    """
+    根据文件流开头的内容获取MIME类型，读取后将流复位到开头
+    
+    Args:
+        stream: 可seek的二进制文件流
+        
+    Returns:
+        Optional[str]: MIME类型
+    """
+    try:
+        head = stream.read(MAGIC_PREFIX_SIZE)
+        stream.seek(0)
+    except Exception as e:
+        logger.error(f"读取文件流失败: {e}")
+        return None
+    return get_file_type_by_content(head)
+
 def validate_file_type(filename: str) -> bool:
     """
     验证文件类型是否支持
@@ -156,14 +235,8 @@ def validate_file_type(filename: str) -> bool:
         bool: 是否支持
     """
     try:
-        file_extension = Path(filename).suffix.lower()
-        
         # 检查扩展名是否在支持列表中
-        for mime_type, extensions in SUPPORTED_FILE_TYPES.items():
-            if file_extension in extensions:
-                return True
-        
-        return False
+        return Path(filename).suffix.lower() in _SUPPORTED_EXTS
         
     except Exception as e:
         logger.error(f"验证文件类型失败: {e}")
@@ -207,31 +280,34 @@ def extract_text_from_pdf(file_stream: io.BytesIO) -> str:
         return ""
     
     try:
-        text = ""
+        import pdfplumber
+        import pypdf
+        
+        pages: List[str] = []
         
         # 首先尝试使用pdfplumber
         try:
-            import pdfplumber
             with pdfplumber.open(file_stream) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
                     if page_text:
-                        text += page_text + "\n"
+                        pages.append(page_text)
         except Exception as e:
             logger.warning(f"pdfplumber提取失败，尝试pypdf: {e}")
             
             # 回退到pypdf
+            pages.clear()
             file_stream.seek(0)
             try:
                 reader = pypdf.PdfReader(file_stream)
                 for page in reader.pages:
                     page_text = page.extract_text()
                     if page_text:
-                        text += page_text + "\n"
+                        pages.append(page_text)
             except Exception as e2:
                 logger.error(f"pypdf提取也失败: {e2}")
         
-        return text.strip()
+        return "\n".join(pages).strip()
         
     except Exception as e:
         logger.error(f"PDF文本提取失败: {e}")
@@ -251,21 +327,21 @@ def extract_text_from_docx(file_stream: io.BytesIO) -> str:
         return ""
     
     try:
+        from docx import Document
+        
         doc = Document(file_stream)
-        text = ""
         
         # 提取段落文本
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        parts = [paragraph.text for paragraph in doc.paragraphs]
         
-        # 提取表格文本
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + "\t"
-                text += "\n"
+        # 提取表格文本，每行单元格以制表符分隔
+        parts.extend(
+            "\t".join(cell.text for cell in row.cells)
+            for table in doc.tables
+            for row in table.rows
+        )
         
-        return text.strip()
+        return "\n".join(parts).strip()
         
     except Exception as e:
         logger.error(f"Word文档文本提取失败: {e}")
@@ -285,37 +361,68 @@ def extract_text_from_xlsx(file_stream: io.BytesIO) -> str:
         return ""
     
     try:
-        # 使用openpyxl读取Excel
-        workbook = openpyxl.load_workbook(file_stream)
-        text = ""
+        import pandas as pd
         
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            text += f"工作表: {sheet_name}\n"
-            
-            for row in sheet.iter_rows(values_only=True):
-                row_text = []
-                for cell in row:
-                    if cell is not None:
-                        row_text.append(str(cell))
-                    else:
-                        row_text.append("")
-                text += "\t".join(row_text) + "\n"
-            
-            text += "\n"
+        # 一次读入全部工作表，由pandas的C写出器按行输出制表符分隔文本
+        sheets = pd.read_excel(file_stream, sheet_name=None, header=None, dtype=str, engine="openpyxl")
+        buffer = io.StringIO()
         
-        return text.strip()
+        for sheet_name, df in sheets.items():
+            buffer.write(f"工作表: {sheet_name}\n")
+            df.to_csv(buffer, sep="\t", index=False, header=False, na_rep="", lineterminator="\n")
+            buffer.write("\n")
+        
+        return buffer.getvalue().strip()
         
     except Exception as e:
         logger.error(f"Excel文本提取失败: {e}")
         return ""
 
-def extract_text_from_image(file_stream: io.BytesIO) -> str:
+def _preprocess_for_ocr(image):
+    """OCR前预处理：去掉透明通道，低分辨率图片放大到约300DPI，双边滤波去噪后四周留白"""
+    from PIL import Image, ImageOps
+    
+    dpi = (image.info.get('dpi') or (72, 72))[0] or 72
+    image = image.convert('RGB')
+    
+    scale = min(OCR_TARGET_DPI / dpi, OCR_MAX_SIDE / max(image.size))
+    if scale > 1:
+        width, height = image.size
+        image = image.resize((round(width * scale), round(height * scale)), Image.LANCZOS)
+    
+    if HAS_CV2:
+        try:
+            import cv2
+            import numpy as np
+            image = Image.fromarray(cv2.bilateralFilter(np.asarray(image), 5, 75, 2))
+        except ImportError as e:
+            logger.warning(f"OpenCV不可用，跳过图片去噪: {e}")
+    
+    return ImageOps.expand(image, border=OCR_BORDER, fill='white')
+
+def _ocr_image(image) -> str:
+    """识别图片文字，优先使用常驻的tesserocr引擎，失败时回退到pytesseract"""
+    global _tess_api
+    if HAS_TESSEROCR:
+        try:
+            with _tess_lock:
+                if _tess_api is None:
+                    from tesserocr import PyTessBaseAPI
+                    _tess_api = PyTessBaseAPI(lang=OCR_LANG, psm=OCR_PSM)
+                _tess_api.SetImage(image)
+                return _tess_api.GetUTF8Text()
+        except Exception as e:
+            logger.warning(f"tesserocr识别失败，改用pytesseract: {e}")
+    
+    import pytesseract
+    return pytesseract.image_to_string(image, lang=OCR_LANG, config=f'--psm {OCR_PSM}')
+
+def extract_text_from_image(file_stream: BinaryIO) -> str:
     """
     从图片提取文本（OCR）
     
     Args:
-        file_stream: 图片文件流
+        file_stream: 图片文件流（BytesIO或以二进制模式打开的文件对象）
         
     Returns:
         str: 提取的文本内容
@@ -324,27 +431,74 @@ def extract_text_from_image(file_stream: io.BytesIO) -> str:
         return ""
     
     try:
-        image = Image.open(file_stream)
-        text = pytesseract.image_to_string(image, lang='chi_sim+eng')
-        return text.strip()
+        # 按内容指纹缓存，读取整个流以支持任意文件对象（getbuffer仅BytesIO可用）
+        file_stream.seek(0)
+        data = file_stream.read()
+        key = (generate_file_fingerprint(data), OCR_LANG)
+        with _ocr_cache_lock:
+            cached = _ocr_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        from PIL import Image
+        
+        image = _preprocess_for_ocr(Image.open(io.BytesIO(data)))
+        text = _ocr_image(image).strip()
+        
+        with _ocr_cache_lock:
+            _ocr_cache[key] = text
+        return text
         
     except Exception as e:
         logger.error(f"图片OCR提取失败: {e}")
         return ""
 
-def generate_file_hash(file_content: bytes) -> str:
+def generate_file_hash(file_content: Union[bytes, BinaryIO]) -> str:
     """
-    生成文件哈希值
+    生成文件哈希值（SHA-256，OpenSSL在支持的CPU上使用SHA硬件指令）
     
     Args:
-        file_content: 文件内容
+        file_content: 文件内容，或以二进制模式打开的文件对象（分块读取，不整体载入内存）
         
     Returns:
         str: 文件哈希值
     """
     try:
-        import hashlib
-        return hashlib.md5(file_content).hexdigest()
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(file_content).hexdigest()
+        return hashlib.file_digest(file_content, "sha256").hexdigest()
+    except Exception as e:
+        logger.error(f"生成文件哈希失败: {e}")
+        return ""
+
+def generate_file_fingerprint(file_content: Union[bytes, memoryview]) -> str:
+    """
+    生成文件内容指纹（非加密哈希，速度远高于SHA-256），仅用于缓存键、去重等进程内标识，
+    需要防篡改或持久化的场景请使用generate_file_hash
+    
+    Args:
+        file_content: 文件内容
+        
+    Returns:
+        str: 128位十六进制指纹
+    """
+    if HAS_XXHASH:
+        return xxhash.xxh3_128(file_content).hexdigest()
+    return hashlib.blake2b(file_content, digest_size=16).hexdigest()
+
+def generate_file_hash_path(path: Union[str, Path]) -> str:
+    """
+    按路径生成文件哈希值，分块读取磁盘文件，不把整个文件载入内存
+    
+    Args:
+        path: 文件路径
+        
+    Returns:
+        str: 文件哈希值，与generate_file_hash对同一内容的结果一致
+    """
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
     except Exception as e:
         logger.error(f"生成文件哈希失败: {e}")
         return ""
@@ -360,24 +514,12 @@ def get_file_category(file_type: str) -> str:
         str: 文件分类
     """
     try:
-        if file_type.startswith('image/'):
-            return 'image'
-        elif file_type.startswith('video/'):
-            return 'video'
-        elif file_type.startswith('audio/'):
-            return 'audio'
-        elif file_type in ['application/pdf', 'application/msword', 
-                          'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
-            return 'document'
-        elif file_type in ['application/vnd.ms-excel', 
-                          'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet']:
-            return 'spreadsheet'
-        elif file_type.startswith('text/'):
-            return 'text'
-        elif 'zip' in file_type or 'rar' in file_type or 'tar' in file_type:
+        category = _EXACT_CATEGORY.get(file_type) or _PREFIX_CATEGORY.get(file_type.partition('/')[0])
+        if category:
+            return category
+        if any(keyword in file_type for keyword in _ARCHIVE_KEYWORDS):
             return 'archive'
-        else:
-            return 'other'
+        return 'other'
             
     except Exception as e:
         logger.error(f"获取文件分类失败: {e}")
@@ -397,15 +539,9 @@ def format_file_size(size_bytes: int) -> str:
         if size_bytes == 0:
             return "0 B"
         
-        size_names = ["B", "KB", "MB", "GB", "TB"]
-        i = 0
-        size = float(size_bytes)
-        
-        while size >= 1024.0 and i < len(size_names) - 1:
-            size /= 1024.0
-            i += 1
-        
-        return f"{size:.1f} {size_names[i]}"
+        # 每1024进一级，由二进制位数直接算出单位
+        i = 0 if size_bytes < 0 else min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+        return f"{size_bytes / (1 << (10 * i)):.1f} {_SIZE_UNITS[i]}"
         
     except Exception as e:
         logger.error(f"格式化文件大小失败: {e}")
@@ -423,10 +559,8 @@ def is_safe_filename(filename: str) -> bool:
     """
     try:
         # 检查危险字符
-        dangerous_chars = ['..', '/', '\\', ':', '*', '?', '"', '<', '>', '|']
-        for char in dangerous_chars:
-            if char in filename:
-                return False
+        if _UNSAFE_FILENAME_RE.search(filename):
+            return False
         
         # 检查文件名长度
         if len(filename) > 255:
@@ -453,17 +587,16 @@ def sanitize_filename(filename: str) -> str:
         str: 清理后的文件名
     """
     try:
-        import re
-        
         # 移除危险字符
-        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        filename = _FILENAME_CHARS_RE.sub('_', filename)
         
         # 移除连续的点
-        filename = re.sub(r'\.{2,}', '.', filename)
+        filename = _REPEATED_DOTS_RE.sub('.', filename)
         
         # 限制长度
         if len(filename) > 255:
-            name, ext = Path(filename).stem, Path(filename).suffix
+            path = Path(filename)
+            name, ext = path.stem, path.suffix
             max_name_len = 255 - len(ext)
             filename = name[:max_name_len] + ext
         
@@ -23,36 +23,28 @@ def fix_file_names():
     db = SessionLocal()
     
     try:
-        # 查询所有文件记录
-        files = db.query(FileRecord).filter(FileRecord.is_deleted == False).all()
+        # 只查询需要的列，避免加载文件内容等大字段
+        rows = db.query(
+            FileRecord.id, FileRecord.original_name, FileRecord.file_extension
+        ).filter(FileRecord.is_deleted == False).all()
         
-        fixed_count = 0
-        for file_record in files:
-            original_name = file_record.original_name
-            
+        updates = []
+        for file_id, original_name, file_extension in rows:
             # 检查是否包含乱码字符
             if '?' in original_name or len(original_name.encode('utf-8', errors='ignore')) < len(original_name):
                 print(f"发现乱码文件名: {original_name}")
                 
-                # 尝试根据存储文件名和扩展名重建文件名
-                stored_name = file_record.stored_name
-                file_extension = file_record.file_extension or ''
-                
                 # 生成一个清晰的文件名
-                if file_extension:
-                    new_name = f"文件_{file_record.id[:8]}{file_extension}"
-                else:
-                    new_name = f"文件_{file_record.id[:8]}"
-                
+                new_name = f"文件_{file_id[:8]}{file_extension or ''}"
                 print(f"修复为: {new_name}")
                 
-                # 更新数据库
-                file_record.original_name = new_name
-                fixed_count += 1
+                updates.append({"id": file_id, "original_name": new_name})
         
-        # 提交更改
+        # 一次性批量更新并提交
+        if updates:
+            db.bulk_update_mappings(FileRecord, updates)
         db.commit()
-        print(f"修复完成！共修复 {fixed_count} 个文件名")
+        print(f"修复完成！共修复 {len(updates)} 个文件名")
         
     except Exception as e:
         print(f"修复失败: {e}")
@@ -7,20 +7,34 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import create_engine
-from app.models.file import Base
-from app.models.chat import Base as ChatBase
+from sqlalchemy import Text, cast, create_engine, or_, update
+from app.models.file import Base, FileRecord, ENABLE_PG_TRGM
+import app.models.chat  # noqa: F401  注册聊天相关表
 from app.core.config import settings
 
 def init_database():
     """初始化数据库"""
     try:
         # 创建数据库引擎
-        engine = create_engine(str(settings.DATABASE_URL), echo=True)
+        engine = create_engine(str(settings.DATABASE_URL))
         
-        # 创建所有表
+        # 创建所有表（文件表与聊天表共用同一个MetaData）
         Base.metadata.create_all(bind=engine)
-        ChatBase.metadata.create_all(bind=engine)
+        
+        # create_all不会为已存在的表补建索引，这里单独补齐（如关键词搜索的三元组索引）
+        with engine.begin() as conn:
+            ENABLE_PG_TRGM(FileRecord.__table__, conn)
+        for index in FileRecord.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+        
+        # 回填历史数据中为空的文件元数据：SQL NULL，以及通过JSON类型写入None时存下的JSON 'null'
+        file_metadata = FileRecord.__table__.c.file_metadata
+        with engine.begin() as conn:
+            conn.execute(
+                update(FileRecord.__table__)
+                .where(or_(file_metadata.is_(None), cast(file_metadata, Text) == "null"))
+                .values(file_metadata={})
+            )
         
         print("✅ 数据库表创建成功")
         print(f"📍 数据库位置: {settings.DATABASE_URL}")
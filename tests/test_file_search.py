@@ -0,0 +1,71 @@
+"""
+文件关键词搜索测试
+中文文件名没有分词，搜索必须保持子串匹配语义
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.models.file import FileRecord  # noqa: E402
+from app.services.file_service import FileService  # noqa: E402
+
+
+@pytest.fixture
+def service():
+    """使用内存SQLite的文件服务"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    FileRecord.__table__.create(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    for name, description in [
+        ("项目报告.pdf", "季度总结"),
+        ("需求文档.docx", "quarterly report draft"),
+        ("会议纪要.txt", None),
+    ]:
+        db.add(FileRecord(
+            original_name=name,
+            stored_name=name,
+            file_path=f"files/{name}",
+            file_size=1,
+            file_type="application/octet-stream",
+            stage="售前阶段",
+            uploaded_by="tester",
+            description=description,
+        ))
+    db.commit()
+
+    yield FileService(db)
+
+    db.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("keyword, expected", [
+    ("报告", {"项目报告.pdf"}),
+    ("项目", {"项目报告.pdf"}),
+    ("repo", {"需求文档.docx"}),
+    ("REPORT", {"需求文档.docx"}),
+    ("总结", {"项目报告.pdf"}),
+    ("不存在", set()),
+])
+def test_search_matches_substrings(service, keyword, expected):
+    """中文词内子串、英文部分单词都能搜到"""
+    files = service.get_files(search=keyword)
+    assert {file.original_name for file in files} == expected
+
+
+def test_search_uses_ilike_on_postgresql(service):
+    """PostgreSQL下同样按ILIKE子串匹配（由pg_trgm索引加速），不使用全文检索"""
+    sql = str(service._search_filter("报告").compile(dialect=postgresql.dialect()))
+    assert "ILIKE" in sql
+    assert "tsquery" not in sql